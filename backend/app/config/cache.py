@@ -0,0 +1,192 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, Tuple
+from .metrics import CACHE_LOOKUPS
+
+try:
+    import redis
+except ImportError:  # Only needed when CACHE_BACKEND=redis
+    redis = None
+
+# Reference data (buildings, locations, departments) changes about once a
+# month, so it is served from this cache and invalidated explicitly on writes.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_URL = os.getenv("CACHE_URL", "redis://localhost:6379/0")
+CACHE_TTL = float(os.getenv("CACHE_TTL", "3600"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+
+
+class MemoryCacheBackend:
+    """
+    Per-process LRU cache with per-entry expiry. Each worker process has its
+    own, so an invalidation only reaches the worker that made it; the others
+    serve their entries until CACHE_TTL runs out. Run several workers with
+    CACHE_BACKEND=redis when that matters.
+    """
+
+    # Calls are cheap and safe on the event loop
+    blocking = False
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return False, None
+
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """
+    Cache shared by every worker through Redis, so an invalidation made by one
+    worker is seen by all of them. Values must be JSON serialisable.
+    """
+
+    # Network round trips on a synchronous client: Cache runs them in threads
+    blocking = True
+
+    def __init__(self, url: str = CACHE_URL, key_prefix: str = "nwcs:"):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requires the redis package")
+
+        self.client = redis.Redis.from_url(url)
+        self.key_prefix = key_prefix
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        raw = self.client.get(self.key_prefix + key)
+        if raw is None:
+            return False, None
+
+        return True, json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self.client.set(
+            self.key_prefix + key, json.dumps(value, default=str), px=int(ttl * 1000)
+        )
+
+    def delete_prefix(self, prefix: str) -> None:
+        keys = list(self.client.scan_iter(match=f"{self.key_prefix}{prefix}*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def size(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=f"{self.key_prefix}*"))
+
+
+CACHE_BACKENDS = {
+    "memory": MemoryCacheBackend,
+    "redis": RedisCacheBackend,
+}
+
+
+class Cache:
+    """
+    Read-through cache in front of the database, organised in namespaces
+    (one per table or lookup) that can be invalidated as a whole.
+    """
+
+    _instance: Optional["Cache"] = None
+
+    def __init__(self, backend: Any, default_ttl: float = CACHE_TTL):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def connect(cls) -> "Cache":
+        if cls._instance is None:
+            if CACHE_BACKEND not in CACHE_BACKENDS:
+                raise ValueError(f"Unknown CACHE_BACKEND: {CACHE_BACKEND}")
+
+            cls._instance = cls(CACHE_BACKENDS[CACHE_BACKEND]())
+
+        return cls._instance
+
+    @classmethod
+    def disconnect(cls) -> None:
+        cls._instance = None
+
+    @classmethod
+    def get_instance(cls) -> "Cache":
+        if cls._instance is None:
+            raise RuntimeError("Cache is not connected")
+
+        return cls._instance
+
+    async def get_or_load(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+    ) -> Any:
+        hit, value = await self._call(self.backend.get, f"{namespace}:{key}")
+        if hit:
+            self.hits += 1
+            CACHE_LOOKUPS.labels(namespace, "hit").inc()
+            return value
+
+        self.misses += 1
+        CACHE_LOOKUPS.labels(namespace, "miss").inc()
+        value = await loader()
+        await self._call(
+            self.backend.set, f"{namespace}:{key}", value, ttl or self.default_ttl
+        )
+        return value
+
+    async def _call(self, method: Callable[..., Any], *args: Any) -> Any:
+        """Run a backend call, off the event loop when the backend blocks."""
+        if self.backend.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def invalidate(self, *namespaces: str) -> None:
+        """Drop namespaces; with the memory backend, in this worker only."""
+        for namespace in namespaces:
+            await self._call(self.backend.delete_prefix, f"{namespace}:")
+
+    async def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": await self._call(self.backend.size),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def get_cache() -> Cache:
+    """FastAPI dependency returning the reference-data cache."""
+    return Cache.get_instance()
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Callable, Optional
+from fastapi import HTTPException, Request, Response
+
+# Writes made through this API bump the version of the tables they touch.
+# Versions are kept per process: changes made elsewhere (the Supabase
+# dashboard) cannot be seen, so a client may be answered 304 for up to
+# ETAG_EPOCH_SECONDS after such a change, when every ETag rolls over. The
+# ETags are therefore weak: they promise a recent enough body, not a
+# byte-identical current one.
+ETAG_EPOCH_SECONDS = float(os.getenv("ETAG_EPOCH_SECONDS", "60"))
+
+# With several workers a write bumps only its own worker's versions, so the
+# others would keep answering 304 until the epoch rolls over. Conditional
+# GETs are only answered when this is the sole worker (WEB_CONCURRENCY, as
+# read by uvicorn and gunicorn).
+CONDITIONAL_GETS = int(os.getenv("WEB_CONCURRENCY", "1")) <= 1
+
+# The boot id keeps two workers (or a restarted one) from ever issuing the
+# same ETag for different data.
+_boot_id = uuid.uuid4().hex
+_versions: Counter = Counter()
+_lock = threading.Lock()
+
+
+def bump_table_versions(*tables: str) -> None:
+    with _lock:
+        for table in tables:
+            _versions[table] += 1
+
+
+def table_version(table: str) -> int:
+    return _versions[table]
+
+
+def equipment_version_listener(before: Optional[dict], after: Optional[dict]) -> None:
+    """Equipment change listener keeping the equipment version current."""
+    bump_table_versions("equipment")
+
+
+def compute_etag(request: Request, tables: tuple) -> str:
+    state = "|".join(
+        [
+            _boot_id,
+            str(int(time.time() // ETAG_EPOCH_SECONDS)),
+            request.url.path,
+            str(sorted(request.query_params.multi_items())),
+            *(f"{table}={table_version(table)}" for table in tables),
+        ]
+    )
+    return f'W/"{hashlib.sha1(state.encode()).hexdigest()}"'
+
+
+def opaque_tag(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """Weak comparison, as If-None-Match uses (RFC 9110, section 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    candidates = (opaque_tag(tag.strip()) for tag in if_none_match.split(","))
+    return opaque_tag(etag) in candidates
+
+
+def conditional_get(*tables: str, cache_control: str = "no-cache") -> Callable:
+    """
+    Route dependency answering ``If-None-Match`` with a 304 before the handler
+    runs, so an unchanged poll costs neither a query nor serialisation.
+
+    The weak ETag covers this process's versions of ``tables`` plus the path
+    and query string; the version is read before the handler queries, so a
+    write racing the request can only make the ETag older than the body,
+    never newer. See ETAG_EPOCH_SECONDS for writes this process cannot see;
+    with several workers (CONDITIONAL_GETS off) only Cache-Control is set.
+    """
+
+    def dependency(request: Request, response: Response) -> None:
+        if not CONDITIONAL_GETS:
+            response.headers["Cache-Control"] = cache_control
+            return
+
+        headers = {
+            "ETag": compute_etag(request, tables),
+            "Cache-Control": cache_control,
+        }
+        if etag_matches(headers["ETag"], request.headers.get("if-none-match")):
+            raise HTTPException(status_code=304, headers=headers)
+
+        response.headers.update(headers)
+
+    return dependency
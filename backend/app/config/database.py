@@ -1,29 +1,283 @@
+import asyncio
+import copy
+import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from supabase import create_client, Client
-from typing import Optional
+from fastapi import HTTPException
+from supabase import create_client, Client, ClientOptions
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+import httpx
+import orjson
+from .memory_database import MemoryClient
+from .metrics import DB_QUERIES_COALESCED, observe_query, query_labels
 
 # Load environment variables
 load_dotenv()
 
+# supabase-py is synchronous, so every query is offloaded to a bounded thread
+# pool. This keeps a slow PostgREST round trip from stalling the event loop.
+DB_MAX_WORKERS = int(os.getenv("DB_MAX_WORKERS", "16"))
+DB_QUERY_TIMEOUT = float(os.getenv("DB_QUERY_TIMEOUT", "10"))
+
+# Rows fetched per round trip when walking a whole table. PostgREST caps
+# responses at 1000 rows by default.
+DB_PAGE_SIZE = int(os.getenv("DB_PAGE_SIZE", "1000"))
+
+# HTTP connection pool shared by every query made through the client.
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", str(DB_MAX_WORKERS)))
+DB_MAX_KEEPALIVE = int(os.getenv("DB_MAX_KEEPALIVE", str(DB_MAX_CONNECTIONS)))
+DB_KEEPALIVE_EXPIRY = float(os.getenv("DB_KEEPALIVE_EXPIRY", "30"))
+DB_HTTP2 = os.getenv("DB_HTTP2", "true").lower() in ("1", "true", "yes")
+
+# "supabase" talks to PostgREST; "memory" serves the API from an in-process
+# store (see memory_database.py) for local development and benchmarks.
+DB_BACKEND = os.getenv("DB_BACKEND", "supabase")
+DB_BACKENDS = ("supabase", "memory")
+
+# Identical reads issued while one is already in flight wait for it and share
+# its response instead of making their own round trip (single flight).
+DB_COALESCE = os.getenv("DB_COALESCE", "true").lower() in ("1", "true", "yes")
+
+# Read-only database functions whose calls may be shared like table reads
+COALESCED_FUNCTIONS = {
+    "equipment_distribution",
+    "search_equipment",
+    "search_device_users",
+    "department_device_counts",
+}
+
+
+def coalesce_key(query: Any) -> Optional[tuple]:
+    """
+    What makes two queries identical: method, path (table or function),
+    filters and projection, arguments, and the headers selecting the
+    response shape. None for queries that must never be shared, i.e. writes.
+    """
+    request = getattr(query, "request", None)
+    if request is None:
+        return None
+
+    table, method = query_labels(query)
+    method = getattr(method, "value", method)
+    if method != "GET" and table.removeprefix("rpc:") not in COALESCED_FUNCTIONS:
+        return None
+
+    headers = getattr(request, "headers", None) or {}
+    return (
+        method,
+        str(request.path),
+        str(request.params),
+        json.dumps(getattr(request, "json", None), sort_keys=True, default=str),
+        headers.get("prefer"),
+        headers.get("accept"),
+    )
+
+
+def share_response(response: Any) -> Any:
+    """
+    A copy of a shared response whose rows the caller may modify. Rows are
+    JSON-native, so an orjson round trip copies them faster than deepcopy.
+    """
+    shared = copy.copy(response)
+    shared.data = orjson.loads(orjson.dumps(response.data))
+    return shared
+
+
+class _InFlight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.followers = 0
+
 
 class Database:
-    _instance: Optional[Client] = None
+    """
+    The one Supabase client a worker process talks to the database through.
+
+    It is created by the application lifespan hook, handed to route handlers
+    via ``Depends(get_db)``, and closed again on shutdown.
+    """
+
+    _instance: Optional["Database"] = None
+
+    def __init__(
+        self,
+        client: Client,
+        http_client: Optional[httpx.Client] = None,
+        max_workers: int = DB_MAX_WORKERS,
+        timeout: float = DB_QUERY_TIMEOUT,
+    ):
+        self.client = client
+        self.http_client = http_client
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="db"
+        )
+        self.connect_seconds = 0.0
+        self._in_flight: Dict[tuple, _InFlight] = {}
+        # Bumped by every write, and part of every read's key, so a read
+        # issued after a write never shares a response fetched before it
+        self._write_generation = 0
 
     @classmethod
-    def get_client(cls) -> Client:
-        if cls._instance is None:
-            supabase_url = os.getenv("SUPABASE_URL")
-            supabase_key = os.getenv("SUPABASE_KEY")
-            if not supabase_url or not supabase_key:
-                raise ValueError(
-                    "Missing Supabase credentials in environment variables"
-                )
+    def connect(cls, client: Optional[Any] = None) -> "Database":
+        """
+        Connect the process-wide database. ``client`` overrides DB_BACKEND with
+        an already built client, e.g. a seeded MemoryClient.
+        """
+        if cls._instance is not None:
+            return cls._instance
+        if DB_BACKEND not in DB_BACKENDS:
+            raise ValueError(f"Unknown DB_BACKEND: {DB_BACKEND}")
+
+        if client is None and DB_BACKEND == "memory":
+            client = MemoryClient()
+        if client is not None:
+            cls._instance = cls(client)
+            return cls._instance
+
+        supabase_url = os.getenv("SUPABASE_URL")
+        supabase_key = os.getenv("SUPABASE_KEY")
+        if not supabase_url or not supabase_key:
+            raise ValueError("Missing Supabase credentials in environment variables")
+
+        started = time.perf_counter()
+        http_client = httpx.Client(
+            http2=DB_HTTP2,
+            timeout=DB_QUERY_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=DB_MAX_CONNECTIONS,
+                max_keepalive_connections=DB_MAX_KEEPALIVE,
+                keepalive_expiry=DB_KEEPALIVE_EXPIRY,
+            ),
+        )
+        client = create_client(
+            supabase_url,
+            supabase_key,
+            options=ClientOptions(httpx_client=http_client),
+        )
+        cls._instance = cls(client, http_client)
+        cls._instance.connect_seconds = time.perf_counter() - started
 
-            cls._instance = create_client(supabase_url, supabase_key)
+        return cls._instance
+
+    @classmethod
+    def disconnect(cls) -> None:
+        if cls._instance is not None:
+            cls._instance.close()
+            cls._instance = None
+
+    @classmethod
+    def get_instance(cls) -> "Database":
+        if cls._instance is None:
+            raise RuntimeError("Database is not connected")
 
         return cls._instance
 
+    def table(self, table_name: str):
+        return self.client.table(table_name)
+
+    def from_(self, table_name: str):
+        return self.client.from_(table_name)
+
+    def rpc(self, fn: str, params: Optional[dict] = None):
+        return self.client.rpc(fn, params or {})
+
+    async def execute(self, query: Any, timeout: Optional[float] = None) -> Any:
+        """
+        Run a query builder's blocking ``execute()`` on the database thread pool.
+
+        A query that outlives its timeout is abandoned with a 504; the worker
+        thread finishes the round trip in the background and is then reused.
+        A read identical to one already in flight shares its response.
+        """
+        key = coalesce_key(query) if DB_COALESCE else None
+        if key is None:
+            self._write_generation += 1
+            return await self._execute(query, timeout)
+
+        key = (self._write_generation, *key)
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            in_flight.followers += 1
+            DB_QUERIES_COALESCED.labels(*query_labels(query)).inc()
+            # shield: a caller giving up must not cancel the others' query
+            return share_response(await asyncio.shield(in_flight.task))
+
+        in_flight = _InFlight(asyncio.ensure_future(self._execute(query, timeout)))
+        self._in_flight[key] = in_flight
+        in_flight.task.add_done_callback(lambda task: self._finish(key, task))
+        response = await asyncio.shield(in_flight.task)
+        return share_response(response) if in_flight.followers else response
+
+    def _finish(self, key: tuple, task: asyncio.Task) -> None:
+        self._in_flight.pop(key, None)
+        if not task.cancelled():
+            # Retrieved here too, in case every caller gave up on it
+            task.exception()
+
+    async def _execute(self, query: Any, timeout: Optional[float] = None) -> Any:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        response = None
+        try:
+            future = loop.run_in_executor(self.executor, query.execute)
+            response = await asyncio.wait_for(future, timeout or self.timeout)
+            return response
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Database query timed out")
+        finally:
+            observe_query(query, started, response)
+
+    async def fetch_pages(
+        self,
+        make_query: Callable[[], Any],
+        key: str,
+        page_size: int = DB_PAGE_SIZE,
+    ) -> AsyncIterator[List[dict]]:
+        """
+        Yield the rows of ``make_query()`` one page at a time, using keyset
+        pagination on the unique column ``key`` (which must be selected).
+        """
+        last_key = None
+        while True:
+            query = make_query().order(key).limit(page_size)
+            if last_key is not None:
+                query = query.gt(key, last_key)
+
+            response = await self.execute(query)
+            if response.data:
+                yield response.data
+            if len(response.data) < page_size:
+                return
+            last_key = response.data[-1][key]
+
+    def open_connections(self) -> int:
+        if self.http_client is None:
+            return 0
+
+        pool = getattr(self.http_client._transport, "_pool", None)
+        return len(getattr(pool, "connections", []))
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.client).__name__,
+            "connect_seconds": round(self.connect_seconds, 6),
+            "open_connections": self.open_connections(),
+            "max_connections": DB_MAX_CONNECTIONS,
+            "http2": DB_HTTP2,
+            "coalesce": DB_COALESCE,
+            "reads_in_flight": len(self._in_flight),
+        }
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+        if self.http_client is not None:
+            self.http_client.close()
+
 
-# Create a convenience instance
-supabase = Database.get_client()
+def get_db() -> Database:
+    """FastAPI dependency returning the connected database."""
+    return Database.get_instance()
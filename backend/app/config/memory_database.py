@@ -0,0 +1,1094 @@
+import bisect
+import copy
+import functools
+import re
+import threading
+from collections import Counter, defaultdict
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from postgrest.exceptions import APIError
+from ..services.search_index import LocalSearchIndex
+
+# Primary key of every table in the schema (see the ER diagram in README.md)
+PRIMARY_KEYS = {
+    "app_users": "user_id",
+    "departments": "department_id",
+    "buildings": "building_id",
+    "locations": "location_id",
+    "employment_types": "employment_type_id",
+    "device_users": "device_user_id",
+    "equipment": "equipment_id",
+    "equipment_assignments": "assignment_id",
+    "disposed_equipment": "disposal_id",
+    "equipment_history": "history_id",
+    "equipment_tombstones": "equipment_id",
+}
+
+# Unique constraints besides the primary key
+UNIQUE_COLUMNS = {
+    "equipment": ("asset_tag",),
+}
+
+# (table, column) -> referenced table, used to resolve nested embeds
+FOREIGN_KEYS = {
+    ("locations", "building_id"): "buildings",
+    ("device_users", "department_id"): "departments",
+    ("device_users", "employment_type_id"): "employment_types",
+    ("equipment", "location_id"): "locations",
+    ("equipment", "current_device_user_id"): "device_users",
+    ("equipment_assignments", "equipment_id"): "equipment",
+    ("equipment_assignments", "device_user_id"): "device_users",
+    ("disposed_equipment", "equipment_id"): "equipment",
+    ("equipment_history", "equipment_id"): "equipment",
+    ("equipment_history", "location_id"): "locations",
+    ("equipment_history", "device_user_id"): "device_users",
+}
+
+# Columns filled in on insert, like the column defaults in Postgres
+TIMESTAMP_DEFAULTS = {
+    "equipment": ("created_at", "updated_at"),
+    "equipment_assignments": ("created_at",),
+    "equipment_history": ("change_date",),
+    "equipment_tombstones": ("deleted_at",),
+    "app_users": ("created_at", "updated_at"),
+}
+
+# Other column defaults applied on insert
+COLUMN_DEFAULTS = {
+    "device_users": {"device_count": 0},
+}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split on commas that are not inside parentheses."""
+    parts, depth, current = [], 0, []
+    for char in text:
+        if char == "," and depth == 0:
+            parts.append("".join(current))
+            current = []
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        current.append(char)
+    parts.append("".join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def parse_select(text: str) -> List[dict]:
+    """
+    Parse a PostgREST select string into column and embed nodes, e.g.
+    ``*, device_user:device_users!inner (first_name, department:departments(*))``.
+    """
+    nodes = []
+    for part in _split_top_level(" ".join(text.split())):
+        if "(" in part:
+            head, children = part.split("(", 1)
+            head = head.strip()
+            alias, _, target = head.rpartition(":")
+            target, *hints = target.split("!")
+            foreign_keys = [hint for hint in hints if hint not in ("inner", "left")]
+            nodes.append(
+                {
+                    "type": "embed",
+                    "alias": alias or target,
+                    "table": target.strip(),
+                    "inner": "inner" in hints,
+                    "foreign_key": foreign_keys[0] if foreign_keys else None,
+                    "children": parse_select(children[: children.rindex(")")]),
+                }
+            )
+        else:
+            alias, _, column = part.rpartition(":")
+            nodes.append({"type": "column", "alias": alias or column, "name": column})
+    return nodes
+
+
+@functools.lru_cache(maxsize=256)
+def _like_to_regex(pattern: str, case_sensitive: bool = False) -> re.Pattern:
+    escaped = re.escape(pattern).replace("%", ".*").replace("_", ".")
+    flags = re.DOTALL if case_sensitive else re.IGNORECASE | re.DOTALL
+    return re.compile(f"^{escaped}$", flags)
+
+
+def _coerce(value: Any, like: Any) -> Any:
+    """Coerce a filter value to the type of the column it is compared with."""
+    if isinstance(like, bool) or value is None or like is None:
+        return value
+    if isinstance(like, (int, float)) and isinstance(value, str):
+        try:
+            return type(like)(value)
+        except ValueError:
+            return value
+    if isinstance(like, str) and not isinstance(value, str):
+        return value.isoformat() if isinstance(value, (date, datetime)) else str(value)
+    return value
+
+
+def _compare(op: str, actual: Any, expected: Any) -> bool:
+    if op == "is":
+        return actual is None if expected in (None, "null") else actual == expected
+    if op == "in":
+        return any(actual == _coerce(value, actual) for value in expected)
+    if op in ("like", "ilike"):
+        if actual is None:
+            return False
+        regex = _like_to_regex(str(expected), case_sensitive=op == "like")
+        return bool(regex.match(str(actual)))
+    if actual is None:
+        return False
+
+    expected = _coerce(expected, actual)
+    try:
+        return {
+            "eq": actual == expected,
+            "neq": actual != expected,
+            "gt": actual > expected,
+            "gte": actual >= expected,
+            "lt": actual < expected,
+            "lte": actual <= expected,
+        }[op]
+    except TypeError:
+        return False
+
+
+def _parse_or(expression: str) -> Tuple:
+    """
+    ``a.ilike.%x%,and(b.eq.3,c.lt."1.5")`` ->
+    (("a", "ilike", "%x%"), ("and", (("b", "eq", "3"), ("c", "lt", "1.5"))))
+    """
+    conditions = []
+    for part in _split_top_level(expression):
+        for group in ("and", "or"):
+            if part.startswith(f"{group}(") and part.endswith(")"):
+                conditions.append((group, _parse_or(part[len(group) + 1 : -1])))
+                break
+        else:
+            column, op, value = part.split(".", 2)
+            if len(value) > 1 and value[0] == value[-1] == '"':
+                value = value[1:-1]
+            conditions.append((column, op, value))
+    return tuple(conditions)
+
+
+def _condition_matches(condition: Tuple, row: dict) -> bool:
+    if len(condition) == 2:
+        group, conditions = condition
+        combine = all if group == "and" else any
+        return combine(_condition_matches(nested, row) for nested in conditions)
+
+    column, op, value = condition
+    return _compare(op, row.get(column), value)
+
+
+class MemoryResponse:
+    """Stand-in for postgrest's APIResponse."""
+
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class MemoryRequest:
+    """What a query would send, for metrics labels and request keys."""
+
+    def __init__(self, path: str, http_method: str, params: Tuple = ()):
+        self.path = path
+        self.http_method = http_method
+        self.params = params
+
+
+class MemoryQuery:
+    """Chainable query builder mirroring the supabase-py table() API subset."""
+
+    def __init__(self, store: "MemoryClient", table: str):
+        self.store = store
+        self.table = table
+        self.method = "GET"
+        self.columns = "*"
+        self.payload: Any = None
+        self.filters: List[Tuple[str, str, Any]] = []
+        self.or_filters: List[Tuple] = []
+        self.ordering: List[Tuple[str, bool, bool]] = []
+        self.row_limit: Optional[int] = None
+        self.row_offset = 0
+        self.count_rows = False
+        self.return_rows = True
+        self.single_row = False
+
+    @property
+    def request(self) -> MemoryRequest:
+        return MemoryRequest(
+            f"memory/{self.table}",
+            self.method,
+            (
+                self.columns,
+                tuple(self.filters),
+                tuple(self.or_filters),
+                tuple(self.ordering),
+                self.row_limit,
+                self.row_offset,
+                self.single_row,
+                self.count_rows,
+            ),
+        )
+
+    # Operations
+    def select(self, *columns: str, count: Optional[str] = None, **_) -> "MemoryQuery":
+        self.columns = ",".join(columns) if columns else "*"
+        self.count_rows = count is not None
+        return self
+
+    def insert(
+        self, json: Any, returning: Any = "representation", **_
+    ) -> "MemoryQuery":
+        self.method, self.payload = "POST", json
+        self.return_rows = str(getattr(returning, "value", returning)) != "minimal"
+        return self
+
+    def update(self, json: dict, **_) -> "MemoryQuery":
+        self.method, self.payload = "PATCH", json
+        return self
+
+    def delete(self, **_) -> "MemoryQuery":
+        self.method = "DELETE"
+        return self
+
+    # Filters
+    def _filter(self, column: str, op: str, value: Any) -> "MemoryQuery":
+        self.filters.append((column, op, value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "eq", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column, value):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column, value):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "lt", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "lte", value)
+
+    def like(self, column, pattern):
+        return self._filter(column, "like", pattern)
+
+    def ilike(self, column, pattern):
+        return self._filter(column, "ilike", pattern)
+
+    def is_(self, column, value):
+        return self._filter(column, "is", value)
+
+    def in_(self, column, values: Iterable):
+        return self._filter(column, "in", tuple(values))
+
+    def or_(self, filters: str, **_) -> "MemoryQuery":
+        self.or_filters.append(_parse_or(filters))
+        return self
+
+    # Modifiers
+    def order(
+        self,
+        column: str,
+        *,
+        desc: bool = False,
+        nullsfirst: Optional[bool] = None,
+        **_,
+    ) -> "MemoryQuery":
+        # Postgres puts nulls first on descending orders unless told otherwise
+        self.ordering.append((column, desc, desc if nullsfirst is None else nullsfirst))
+        return self
+
+    def limit(self, size: int, **_) -> "MemoryQuery":
+        self.row_limit = size
+        return self
+
+    def range(self, start: int, end: int, **_) -> "MemoryQuery":
+        self.row_offset, self.row_limit = start, end - start + 1
+        return self
+
+    def single(self) -> "MemoryQuery":
+        self.single_row = True
+        return self
+
+    def execute(self) -> MemoryResponse:
+        with self.store.lock:
+            return self.store.run(self)
+
+
+class MemoryRPC:
+    def __init__(self, store: "MemoryClient", fn: str, params: dict):
+        self.store = store
+        self.fn = fn
+        self.params = params
+
+    @property
+    def request(self) -> MemoryRequest:
+        return MemoryRequest(
+            f"memory/rpc/{self.fn}",
+            "POST",
+            tuple(sorted((key, repr(value)) for key, value in self.params.items())),
+        )
+
+    def execute(self) -> MemoryResponse:
+        function = self.store.functions.get(self.fn)
+        if function is None:
+            raise APIError(
+                {"code": "PGRST202", "message": f"Could not find function {self.fn}"}
+            )
+
+        with self.store.lock:
+            return MemoryResponse(copy.deepcopy(function(self.store, **self.params)))
+
+
+class MemoryClient:
+    """
+    In-process stand-in for the Supabase client, for local development,
+    tests and benchmarks (DB_BACKEND=memory). It implements the slice of the
+    PostgREST API the routers use - select with nested embeds, the filter
+    operators, or_(), order/limit, insert/update/delete and single() - plus
+    Python versions of the database functions in migrations/.
+    """
+
+    def __init__(self, tables: Optional[Dict[str, List[dict]]] = None):
+        self.lock = threading.RLock()
+        self.rows: Dict[str, List[dict]] = defaultdict(list)
+        self.by_key: Dict[str, Dict[Any, dict]] = defaultdict(dict)
+        self.next_key: Dict[str, int] = defaultdict(lambda: 1)
+        self.versions: Counter = Counter()
+        self._search_indexes: Dict[str, Tuple[int, LocalSearchIndex]] = {}
+        self._column_indexes: Dict[Tuple[str, str], Tuple[int, dict]] = {}
+        self.functions: Dict[str, Callable[..., Any]] = dict(MEMORY_FUNCTIONS)
+        for table, rows in (tables or {}).items():
+            self.load(table, rows)
+        # Backfill derived columns, as the migrations do
+        sync_current_device_user(
+            self,
+            [],
+            [{"equipment_id": key} for key in self.by_key["equipment"]],
+            touch=False,
+        )
+        sync_device_count(
+            self,
+            [],
+            [{"device_user_id": key} for key in self.by_key["device_users"]],
+        )
+
+    def load(self, table: str, rows: Iterable[dict]) -> None:
+        key = PRIMARY_KEYS.get(table)
+        for row in rows:
+            self._store(table, dict(row), key)
+
+    def _store(self, table: str, row: dict, key: Optional[str]) -> dict:
+        if key is not None:
+            if row.get(key) is None:
+                row[key] = self.next_key[table]
+            self.next_key[table] = max(self.next_key[table], row[key] + 1)
+            if self.rows[table] and row[key] < self.rows[table][-1][key]:
+                keys = [existing[key] for existing in self.rows[table]]
+                self.rows[table].insert(bisect.bisect(keys, row[key]), row)
+            else:
+                self.rows[table].append(row)
+            self.by_key[table][row[key]] = row
+        else:
+            self.rows[table].append(row)
+        self.versions[table] += 1
+        return row
+
+    # Client API
+    def table(self, table_name: str) -> MemoryQuery:
+        return MemoryQuery(self, table_name)
+
+    from_ = table
+
+    def rpc(self, fn: str, params: Optional[dict] = None, **_) -> MemoryRPC:
+        return MemoryRPC(self, fn, params or {})
+
+    # Query execution
+    def _candidates(self, query: MemoryQuery) -> Iterable[dict]:
+        """Narrow the scan using the primary or a foreign key where the filters allow it."""
+        key = PRIMARY_KEYS.get(query.table)
+        rows = self.rows[query.table]
+        for column, op, value in query.filters:
+            if column != key:
+                continue
+            if op == "eq":
+                row = self.by_key[query.table].get(_coerce(value, 0))
+                return [row] if row is not None else []
+            if op in ("gt", "gte") and rows:
+                keys_view = _KeyView(rows, key)
+                find = bisect.bisect_right if op == "gt" else bisect.bisect_left
+                start = find(keys_view, _coerce(value, 0))
+                return (rows[index] for index in range(start, len(rows)))
+        for column, op, value in query.filters:
+            if op == "eq" and (query.table, column) in FOREIGN_KEYS:
+                # Groups keep storage order, so key ordering still holds
+                return self.column_index(query.table, column).get(_coerce(value, 0), [])
+        return rows
+
+    def _matches(self, query: MemoryQuery, row: dict) -> bool:
+        for column, op, value in query.filters:
+            if "." in column:
+                continue
+            if not _compare(op, row.get(column), value):
+                return False
+        for group in query.or_filters:
+            if not _condition_matches(("or", group), row):
+                return False
+        return True
+
+    def _select_rows(self, query: MemoryQuery) -> Tuple[List[dict], int]:
+        if query.table not in PRIMARY_KEYS and query.table not in self.rows:
+            raise APIError({"code": "42P01", "message": f"Unknown table {query.table}"})
+
+        key = PRIMARY_KEYS.get(query.table)
+        already_sorted = not query.ordering or query.ordering == [(key, False, False)]
+        candidates = (
+            row for row in self._candidates(query) if self._matches(query, row)
+        )
+
+        if already_sorted and query.row_limit is not None and not query.count_rows:
+            # Rows are stored in key order, so stop scanning once the page is full
+            wanted = query.row_offset + query.row_limit
+            rows = []
+            for row in candidates:
+                rows.append(row)
+                if len(rows) >= wanted:
+                    break
+            return rows[query.row_offset :], len(rows)
+
+        rows = list(candidates)
+        for column, desc, nulls_first in reversed(query.ordering):
+            rows.sort(
+                key=lambda row: (
+                    (row.get(column) is None) != (nulls_first != desc),
+                    row.get(column) if row.get(column) is not None else 0,
+                ),
+                reverse=desc,
+            )
+        total = len(rows)
+        if query.row_limit is not None:
+            rows = rows[query.row_offset : query.row_offset + query.row_limit]
+        elif query.row_offset:
+            rows = rows[query.row_offset :]
+        return rows, total
+
+    def _embed_lookup(
+        self, parent: str, target: str, foreign_key: Optional[str] = None
+    ) -> Tuple[str, str, bool]:
+        """
+        (parent column, target column, to_many) joining parent to target,
+        optionally through the foreign key column named by a ``!hint``.
+        """
+        for (table, column), referenced in FOREIGN_KEYS.items():
+            if table == parent and referenced == target:
+                if foreign_key in (None, column):
+                    return column, PRIMARY_KEYS[target], False
+        for (table, column), referenced in FOREIGN_KEYS.items():
+            if table == target and referenced == parent:
+                if foreign_key in (None, column):
+                    return PRIMARY_KEYS[parent], column, True
+        raise APIError(
+            {
+                "code": "PGRST200",
+                "message": f"Could not find a relationship between {parent} and {target}",
+            }
+        )
+
+    def _shape(
+        self, table: str, rows: List[dict], nodes: List[dict], filters: List
+    ) -> List[Optional[dict]]:
+        """Project ``rows`` onto the select tree, resolving embeds level by level."""
+        shaped = [{} for _ in rows]
+        for node in nodes:
+            if node["type"] == "column":
+                for source, target in zip(rows, shaped):
+                    if node["name"] == "*":
+                        target.update(source)
+                    else:
+                        target[node["alias"]] = source.get(node["name"])
+                continue
+
+            parent_column, target_column, to_many = self._embed_lookup(
+                table, node["table"], node["foreign_key"]
+            )
+            if to_many:
+                grouped = self.column_index(node["table"], target_column)
+                children_of = [grouped.get(row.get(parent_column), []) for row in rows]
+            else:
+                index = self.by_key[node["table"]]
+                children_of = [
+                    (
+                        [index[row[parent_column]]]
+                        if row.get(parent_column) in index
+                        else []
+                    )
+                    for row in rows
+                ]
+
+            prefix = f"{node['alias']}."
+            nested_filters = [
+                (column[len(prefix) :], op, value)
+                for column, op, value in filters
+                if column.startswith(prefix)
+            ]
+            flat = [child for children in children_of for child in children]
+            flat_filters = [f for f in nested_filters if "." not in f[0]]
+            keep = [
+                all(
+                    _compare(op, child.get(column), value)
+                    for column, op, value in flat_filters
+                )
+                for child in flat
+            ]
+            shaped_flat = self._shape(
+                node["table"], flat, node["children"], nested_filters
+            )
+
+            position = 0
+            for target, children in zip(shaped, children_of):
+                values = []
+                for _ in children:
+                    if keep[position] and shaped_flat[position] is not None:
+                        values.append(shaped_flat[position])
+                    position += 1
+                if to_many:
+                    target[node["alias"]] = values
+                else:
+                    target[node["alias"]] = values[0] if values else None
+                if node["inner"] and not values:
+                    target["__drop__"] = True
+
+        return [None if row.pop("__drop__", False) else row for row in shaped]
+
+    def run(self, query: MemoryQuery) -> MemoryResponse:
+        if query.method == "POST":
+            data = self._insert(query)
+        elif query.method == "PATCH":
+            data = self._update(query)
+        elif query.method == "DELETE":
+            data = self._delete(query)
+        else:
+            rows, total = self._select_rows(query)
+            shaped = self._shape(
+                query.table, rows, parse_select(query.columns), query.filters
+            )
+            data = [row for row in shaped if row is not None]
+            if query.single_row:
+                if len(data) != 1:
+                    raise APIError(
+                        {
+                            "code": "PGRST116",
+                            "message": "JSON object requested, multiple (or no) rows returned",
+                        }
+                    )
+                return MemoryResponse(copy.deepcopy(data[0]))
+            return MemoryResponse(
+                copy.deepcopy(data), total if query.count_rows else None
+            )
+
+        if query.single_row:
+            if len(data) != 1:
+                raise APIError(
+                    {
+                        "code": "PGRST116",
+                        "message": "JSON object requested, multiple (or no) rows returned",
+                    }
+                )
+            return MemoryResponse(copy.deepcopy(data[0]))
+        return MemoryResponse(copy.deepcopy(data) if query.return_rows else [])
+
+    def _insert(self, query: MemoryQuery) -> List[dict]:
+        records = query.payload if isinstance(query.payload, list) else [query.payload]
+        key = PRIMARY_KEYS.get(query.table)
+        rows = []
+        for record in records:
+            row = {
+                column: (
+                    value.isoformat() if isinstance(value, (date, datetime)) else value
+                )
+                for column, value in record.items()
+            }
+            for column in TIMESTAMP_DEFAULTS.get(query.table, ()):
+                row.setdefault(column, _now())
+            for column, default in COLUMN_DEFAULTS.get(query.table, {}).items():
+                row.setdefault(column, default)
+            if self.rows[query.table]:
+                # Columns left out of the insert come back as NULL
+                for column in self.rows[query.table][0]:
+                    row.setdefault(column, None)
+            rows.append(row)
+
+        # Checked before anything is stored: an insert is all or nothing
+        for column in ((key,) if key else ()) + UNIQUE_COLUMNS.get(query.table, ()):
+            existing = (
+                self.by_key[query.table]
+                if column == key
+                else self.column_index(query.table, column)
+            )
+            values = [row[column] for row in rows if row.get(column) is not None]
+            duplicates = {value for value in values if value in existing}
+            if duplicates or len(set(values)) < len(values):
+                raise APIError(
+                    {
+                        "code": "23505",
+                        "message": "duplicate key value violates unique constraint"
+                        f" on {query.table}.{column}",
+                    }
+                )
+        inserted = [self._store(query.table, row, key) for row in rows]
+        self.after_write(query.table, [], inserted)
+        return inserted
+
+    def _update(self, query: MemoryQuery) -> List[dict]:
+        rows, _ = self._select_rows(query)
+        changes = dict(query.payload)
+        if "updated_at" in TIMESTAMP_DEFAULTS.get(query.table, ()):
+            changes.setdefault("updated_at", _now())
+        old_rows = [dict(row) for row in rows]
+        for row in rows:
+            row.update(changes)
+        if rows:
+            self.versions[query.table] += 1
+            self.after_write(query.table, old_rows, rows)
+        return rows
+
+    def _delete(self, query: MemoryQuery) -> List[dict]:
+        rows, _ = self._select_rows(query)
+        key = PRIMARY_KEYS.get(query.table)
+        doomed = {id(row) for row in rows}
+        self.rows[query.table] = [
+            row for row in self.rows[query.table] if id(row) not in doomed
+        ]
+        if key is not None:
+            for row in rows:
+                self.by_key[query.table].pop(row[key], None)
+        if rows:
+            self.versions[query.table] += 1
+            self.after_write(query.table, rows, [])
+        return rows
+
+    def after_write(
+        self, table: str, old_rows: List[dict], new_rows: List[dict]
+    ) -> None:
+        """Run the row triggers of ``table``, like AFTER ... FOR EACH ROW."""
+        for trigger in TRIGGERS.get(table, ()):
+            trigger(self, old_rows, new_rows)
+
+    def column_index(self, table: str, column: str) -> Dict[Any, List[dict]]:
+        """Rows of ``table`` grouped by ``column``, rebuilt only after the table changes."""
+        version, index = self._column_indexes.get((table, column), (-1, None))
+        if version != self.versions[table]:
+            index = defaultdict(list)
+            for row in self.rows[table]:
+                index[row.get(column)].append(row)
+            self._column_indexes[(table, column)] = (self.versions[table], index)
+        return index
+
+    def search_index(self, table: str, fields: Tuple[str, ...]) -> LocalSearchIndex:
+        """LocalSearchIndex over ``table``, rebuilt only after the table changes."""
+        version, index = self._search_indexes.get(table, (-1, None))
+        if version != self.versions[table]:
+            index = LocalSearchIndex(PRIMARY_KEYS[table], fields)
+            index.rebuild(self.rows[table])
+            self._search_indexes[table] = (self.versions[table], index)
+        return index
+
+
+class _KeyView:
+    """Sequence view of one column over a key-ordered row list, for bisect."""
+
+    def __init__(self, rows: List[dict], key: str):
+        self.rows = rows
+        self.key = key
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, index: int) -> Any:
+        return self.rows[index][self.key]
+
+
+# Python versions of the database functions in migrations/
+
+
+def _raise(code: str, message: str):
+    raise APIError({"code": code, "message": message})
+
+
+def equipment_distribution(store: MemoryClient, group_by: str) -> List[dict]:
+    counts: Counter = Counter()
+    if group_by == "building":
+        buildings = store.by_key["buildings"]
+        locations = store.by_key["locations"]
+        for row in store.rows["equipment"]:
+            if row.get("location_id") is None:
+                continue
+            location = locations.get(row["location_id"]) or {}
+            building = buildings.get(location.get("building_id")) or {}
+            counts[building.get("building_name", "Unassigned")] += 1
+    elif group_by in ("manufacturer", "form_factor", "status"):
+        counts.update(
+            row[group_by]
+            for row in store.rows["equipment"]
+            if row.get(group_by) is not None
+        )
+    else:
+        _raise("P0001", f"Unsupported distribution: {group_by}")
+    return [{"name": name, "value": value} for name, value in counts.most_common()]
+
+
+def create_assignment(
+    store: MemoryClient,
+    p_equipment_id: int,
+    p_device_user_id: int,
+    p_assignment_start_date: str,
+    p_assignment_purpose: Optional[str] = None,
+    p_change_made_by: int = 1,
+) -> dict:
+    equipment = store.by_key["equipment"].get(p_equipment_id)
+    if equipment is None:
+        _raise("P0002", "Equipment not found")
+    if equipment["status"] not in ("Available", "In Storage"):
+        _raise(
+            "P0001",
+            f"Equipment is not available (current status: {equipment['status']})",
+        )
+
+    previous_status = equipment["status"]
+    assignment = store._store(
+        "equipment_assignments",
+        {
+            "equipment_id": p_equipment_id,
+            "device_user_id": p_device_user_id,
+            "assignment_start_date": p_assignment_start_date,
+            "assignment_purpose": p_assignment_purpose,
+            "created_at": _now(),
+        },
+        "assignment_id",
+    )
+    store.after_write("equipment_assignments", [], [assignment])
+    equipment.update({"status": "In Use", "updated_at": _now()})
+    store.versions["equipment"] += 1
+    store._store(
+        "equipment_history",
+        {
+            "equipment_id": p_equipment_id,
+            "device_user_id": p_device_user_id,
+            "location_id": equipment.get("location_id"),
+            "status": "In Use",
+            "assignment_start_date": p_assignment_start_date,
+            "change_made_by": p_change_made_by,
+            "change_date": _now(),
+        },
+        "history_id",
+    )
+    return {"assignment": dict(assignment), "previous_status": previous_status}
+
+
+def end_assignment(
+    store: MemoryClient,
+    p_assignment_id: int,
+    p_new_status: str = "Available",
+    p_change_made_by: int = 1,
+) -> dict:
+    assignment = store.by_key["equipment_assignments"].get(p_assignment_id)
+    if assignment is None:
+        _raise("P0002", "Assignment not found")
+
+    equipment = store.by_key["equipment"].get(assignment["equipment_id"]) or {}
+    previous_status = equipment.get("status")
+    equipment.update({"status": p_new_status, "updated_at": _now()})
+    store.versions["equipment"] += 1
+    store._store(
+        "equipment_history",
+        {
+            "equipment_id": assignment["equipment_id"],
+            "device_user_id": assignment["device_user_id"],
+            "status": p_new_status,
+            "assignment_start_date": assignment["assignment_start_date"],
+            "assignment_end_date": date.today().isoformat(),
+            "change_made_by": p_change_made_by,
+            "change_date": _now(),
+        },
+        "history_id",
+    )
+    query = (
+        store.table("equipment_assignments")
+        .delete()
+        .eq("assignment_id", p_assignment_id)
+    )
+    store._delete(query)
+    return {
+        "equipment_id": assignment["equipment_id"],
+        "previous_status": previous_status,
+    }
+
+
+def create_assignments(
+    store: MemoryClient, p_items: List[dict], p_change_made_by: int = 1
+) -> List[dict]:
+    batch_counts = Counter(item["equipment_id"] for item in p_items)
+    results = []
+    for index, item in enumerate(p_items):
+        equipment = store.by_key["equipment"].get(item["equipment_id"])
+        if equipment is None:
+            error = "Equipment not found"
+        elif item["device_user_id"] not in store.by_key["device_users"]:
+            error = "Device user not found"
+        elif batch_counts[item["equipment_id"]] > 1:
+            error = "Equipment appears more than once in the batch"
+        elif equipment["status"] not in ("Available", "In Storage"):
+            error = (
+                f"Equipment is not available (current status: {equipment['status']})"
+            )
+        else:
+            error = None
+
+        if error:
+            results.append(
+                {
+                    "index": index,
+                    "status": "error",
+                    "equipment_id": item["equipment_id"],
+                    "error": error,
+                }
+            )
+            continue
+
+        created = create_assignment(
+            store,
+            item["equipment_id"],
+            item["device_user_id"],
+            item["assignment_start_date"],
+            item.get("assignment_purpose"),
+            p_change_made_by,
+        )
+        results.append({"index": index, "status": "created", **created})
+    return results
+
+
+def end_assignments(
+    store: MemoryClient,
+    p_assignment_ids: List[int],
+    p_new_status: str = "Available",
+    p_change_made_by: int = 1,
+) -> List[dict]:
+    batch_counts = Counter(p_assignment_ids)
+    results = []
+    for index, assignment_id in enumerate(p_assignment_ids):
+        if assignment_id not in store.by_key["equipment_assignments"]:
+            error = "Assignment not found"
+        elif batch_counts[assignment_id] > 1:
+            error = "Assignment appears more than once in the batch"
+        else:
+            error = None
+
+        if error:
+            results.append(
+                {
+                    "index": index,
+                    "status": "error",
+                    "assignment_id": assignment_id,
+                    "error": error,
+                }
+            )
+            continue
+
+        ended = end_assignment(store, assignment_id, p_new_status, p_change_made_by)
+        results.append(
+            {"index": index, "status": "ended", "assignment_id": assignment_id, **ended}
+        )
+    return results
+
+
+def search_equipment(
+    store: MemoryClient, p_query: str, p_limit: int = 50
+) -> List[dict]:
+    index = store.search_index(
+        "equipment", ("asset_tag", "serial_number", "device_name", "model")
+    )
+    columns = (
+        "equipment_id",
+        "asset_tag",
+        "serial_number",
+        "device_name",
+        "status",
+        "form_factor",
+        "updated_at",
+        "rank",
+    )
+    return [
+        {column: row.get(column) for column in columns}
+        for row in index.search(p_query, p_limit)
+    ]
+
+
+def search_device_users(
+    store: MemoryClient,
+    p_query: str,
+    p_limit: int = 50,
+    p_department_id: Optional[int] = None,
+    p_min_devices: Optional[int] = None,
+    p_max_devices: Optional[int] = None,
+    p_offset: int = 0,
+    p_sort: Optional[str] = None,
+    p_desc: bool = False,
+) -> List[dict]:
+    index = store.search_index("device_users", ("first_name", "last_name", "email"))
+    users = store.by_key["device_users"]
+    departments = store.by_key["departments"]
+    results = []
+    # Filters apply before the limit, as in migrations/007_device_counts.sql
+    for match in index.search(p_query, len(users)):
+        row = users.get(match["device_user_id"])
+        if row is None:
+            continue
+        device_count = row.get("device_count") or 0
+        if p_department_id is not None and row.get("department_id") != p_department_id:
+            continue
+        if p_min_devices is not None and device_count < p_min_devices:
+            continue
+        if p_max_devices is not None and device_count > p_max_devices:
+            continue
+        results.append(
+            {
+                "device_user_id": row["device_user_id"],
+                "first_name": row.get("first_name"),
+                "last_name": row.get("last_name"),
+                "email": row.get("email"),
+                "department_name": (
+                    departments.get(row.get("department_id")) or {}
+                ).get("department_name"),
+                "device_count": device_count,
+                "rank": match["rank"],
+            }
+        )
+        if p_sort is None and len(results) == p_offset + p_limit:
+            break
+    if p_sort is not None:
+        # Rank order breaks ties, as in migrations/007_device_counts.sql
+        columns = {
+            "name": ("last_name", "first_name", "device_user_id"),
+            "device_count": ("device_count", "device_user_id"),
+        }[p_sort]
+        for column in reversed(columns):
+            results.sort(
+                key=lambda user: (
+                    (user[column] is None) != p_desc,
+                    user[column] if user[column] is not None else 0,
+                ),
+                reverse=p_desc,
+            )
+    return results[p_offset : p_offset + p_limit]
+
+
+def sync_current_device_user(
+    store: MemoryClient, old_rows: List[dict], new_rows: List[dict], touch: bool = True
+) -> None:
+    """
+    equipment_assignments trigger from migrations/005_current_assignee.sql.
+    The update it makes bumps updated_at (migrations/008_equipment_changes.sql)
+    unless ``touch`` is false, as for the backfill.
+    """
+    by_equipment = store.column_index("equipment_assignments", "equipment_id")
+    for equipment_id in {row["equipment_id"] for row in old_rows + new_rows}:
+        equipment = store.by_key["equipment"].get(equipment_id)
+        if equipment is None:
+            continue
+
+        current = max(
+            by_equipment.get(equipment_id, []),
+            key=lambda row: (
+                row.get("assignment_start_date") or "",
+                row["assignment_id"],
+            ),
+            default=None,
+        )
+        current_device_user_id = current["device_user_id"] if current else None
+        if equipment.get("current_device_user_id") != current_device_user_id:
+            equipment["current_device_user_id"] = current_device_user_id
+            if touch:
+                equipment["updated_at"] = _now()
+    store.versions["equipment"] += 1
+
+
+def sync_device_count(
+    store: MemoryClient, old_rows: List[dict], new_rows: List[dict]
+) -> None:
+    """equipment_assignments trigger from migrations/007_device_counts.sql."""
+    by_user = store.column_index("equipment_assignments", "device_user_id")
+    for device_user_id in {row["device_user_id"] for row in old_rows + new_rows}:
+        user = store.by_key["device_users"].get(device_user_id)
+        if user is not None:
+            user["device_count"] = len(by_user.get(device_user_id, ()))
+    store.versions["device_users"] += 1
+
+
+def department_device_counts(store: MemoryClient) -> List[dict]:
+    users: Counter = Counter()
+    devices: Counter = Counter()
+    for row in store.rows["device_users"]:
+        users[row.get("department_id")] += 1
+        devices[row.get("department_id")] += row.get("device_count") or 0
+    rows = [
+        {
+            "department_id": department["department_id"],
+            "department_name": department.get("department_name"),
+            "user_count": users[department["department_id"]],
+            "device_count": devices[department["department_id"]],
+        }
+        for department in store.rows["departments"]
+    ]
+    return sorted(rows, key=lambda row: (-row["device_count"], row["department_id"]))
+
+
+def record_equipment_tombstone(
+    store: MemoryClient, old_rows: List[dict], new_rows: List[dict]
+) -> None:
+    """equipment trigger from migrations/008_equipment_changes.sql."""
+    if new_rows:
+        return
+
+    for row in old_rows:
+        store.by_key["equipment_tombstones"].pop(row["equipment_id"], None)
+        store.rows["equipment_tombstones"] = [
+            tombstone
+            for tombstone in store.rows["equipment_tombstones"]
+            if tombstone["equipment_id"] != row["equipment_id"]
+        ]
+        store._store(
+            "equipment_tombstones",
+            {"equipment_id": row["equipment_id"], "deleted_at": _now()},
+            "equipment_id",
+        )
+
+
+# Python versions of the triggers in migrations/, by table
+TRIGGERS: Dict[str, List[Callable[[MemoryClient, List[dict], List[dict]], None]]] = {
+    "equipment": [record_equipment_tombstone],
+    "equipment_assignments": [sync_current_device_user, sync_device_count],
+}
+
+MEMORY_FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "equipment_distribution": equipment_distribution,
+    "create_assignment": create_assignment,
+    "end_assignment": end_assignment,
+    "create_assignments": create_assignments,
+    "end_assignments": end_assignments,
+    "search_equipment": search_equipment,
+    "search_device_users": search_device_users,
+    "department_device_counts": department_device_counts,
+}
@@ -0,0 +1,119 @@
+import time
+from typing import Any, Optional
+from prometheus_client import Counter, Gauge, Histogram
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling a request, by route template",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being handled"
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Response body size, by route template",
+    ["method", "route"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216),
+)
+
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Time spent waiting on a database query, by table or RPC function",
+    ["table", "method"],
+)
+DB_QUERY_ROWS = Histogram(
+    "db_query_rows",
+    "Rows returned by a database query, by table or RPC function",
+    ["table", "method"],
+    buckets=(0, 1, 10, 100, 1000, 10000, 100000),
+)
+DB_QUERY_ERRORS = Counter(
+    "db_query_errors_total",
+    "Database queries that raised or timed out",
+    ["table", "method"],
+)
+
+FEED_SUBSCRIBERS = Gauge(
+    "change_feed_subscribers", "Clients connected to the server-sent change feed"
+)
+# Coalesce rate = db_queries_coalesced_total / (db_queries_coalesced_total +
+# db_query_duration_seconds_count), per table or RPC function
+DB_QUERIES_COALESCED = Counter(
+    "db_queries_coalesced_total",
+    "Reads answered by an identical query already in flight",
+    ["table", "method"],
+)
+
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Reference-data cache lookups, by namespace and outcome",
+    ["namespace", "result"],
+)
+
+
+def query_labels(query: Any) -> tuple:
+    """(table, method) labels for a query builder, e.g. ("equipment", "GET")."""
+    request = getattr(query, "request", None)
+    if request is None:
+        return "unknown", "unknown"
+
+    path = str(request.path).rstrip("/")
+    parts = path.split("/")
+    table = f"rpc:{parts[-1]}" if len(parts) > 1 and parts[-2] == "rpc" else parts[-1]
+    return table, request.http_method
+
+
+def observe_query(query: Any, started: float, response: Optional[Any]) -> None:
+    table, method = query_labels(query)
+    DB_QUERY_LATENCY.labels(table, method).observe(time.perf_counter() - started)
+    if response is None:
+        DB_QUERY_ERRORS.labels(table, method).inc()
+        return
+
+    data = getattr(response, "data", None)
+    if isinstance(data, list):
+        DB_QUERY_ROWS.labels(table, method).observe(len(data))
+    elif data is not None:
+        DB_QUERY_ROWS.labels(table, method).observe(1)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, response size and in-flight requests.
+    Body bytes are counted as they are sent, so streamed responses are
+    measured too.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            REQUEST_LATENCY.labels(method, route_path, str(status)).observe(
+                time.perf_counter() - started
+            )
+            RESPONSE_SIZE.labels(method, route_path).observe(size)
@@ -0,0 +1,28 @@
+import os
+from typing import Any
+import orjson
+from fastapi.responses import JSONResponse
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # Responses fall back to gzip without brotli-asgi
+    BrotliMiddleware = None
+
+# Bodies smaller than this are sent as is; compressing them costs more CPU
+# than the bytes it saves.
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+
+class OrjsonResponse(JSONResponse):
+    """
+    JSON response rendered with orjson, the app's default response class.
+
+    Handlers returning large lists of database rows return it directly, which
+    also skips FastAPI's jsonable_encoder pass: PostgREST rows are already
+    JSON-native, so there is nothing for it to convert.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
@@ -1,5 +1,32 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from .config.cache import Cache
+from .config.conditional import equipment_version_listener
+from .config.database import Database, get_db
+from .config.metrics import MetricsMiddleware
+from .config.responses import (
+    BROTLI_QUALITY,
+    COMPRESSION_MIN_SIZE,
+    GZIP_LEVEL,
+    BrotliMiddleware,
+    OrjsonResponse,
+)
+from .services.autocomplete import AutocompleteIndex
+from .services.change_feed import ChangeFeed
+from .services.changes import (
+    subscribe_equipment_changes,
+    unsubscribe_equipment_changes,
+)
+from .services.dashboard_snapshot import DashboardSnapshot
+from .services.equipment_columns import EquipmentColumns
+from .services.jobs import JobQueue
 
 from .routes import (
     equipment,
@@ -11,9 +38,75 @@ from .routes import (
     reporting,
     inventory,
     users,
+    cache,
+    jobs,
+    events,
+)
+
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s level=%(levelname)s logger=%(name)s %(message)s",
 )
 
-app = FastAPI(title="Equipment Management API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled database client per worker, shared by every router
+    Database.connect()
+    Cache.connect()
+    # Background workers for long exports; needs the running loop
+    JobQueue.connect()
+
+    # In-memory views kept current by the equipment write paths
+    equipment_views = [
+        equipment_version_listener,
+        DashboardSnapshot.get_instance().apply_change,
+        AutocompleteIndex.get_instance().apply_change,
+        ChangeFeed.get_instance().apply_change,
+        EquipmentColumns.get_instance().apply_change,
+    ]
+    for listener in equipment_views:
+        subscribe_equipment_changes(listener)
+    reconciliation = asyncio.create_task(
+        DashboardSnapshot.get_instance().run_reconciliation()
+    )
+    columns_refresh = asyncio.create_task(EquipmentColumns.get_instance().run_refresh())
+    autocomplete_refresh = asyncio.create_task(
+        AutocompleteIndex.get_instance().run_refresh()
+    )
+    yield
+    reconciliation.cancel()
+    columns_refresh.cancel()
+    autocomplete_refresh.cancel()
+    for listener in equipment_views:
+        unsubscribe_equipment_changes(listener)
+    JobQueue.disconnect()
+    Cache.disconnect()
+    Database.disconnect()
+
+
+app = FastAPI(
+    title="Equipment Management API",
+    lifespan=lifespan,
+    default_response_class=OrjsonResponse,
+)
+
+# Compression sits inside the metrics middleware, so response sizes are
+# recorded as sent on the wire
+if BrotliMiddleware is not None:
+    app.add_middleware(
+        BrotliMiddleware,
+        quality=BROTLI_QUALITY,
+        minimum_size=COMPRESSION_MIN_SIZE,
+        gzip_fallback=True,
+        # Compressing the event stream would hold events back in the buffer
+        excluded_handlers=["/events"],
+    )
+else:
+    app.add_middleware(
+        GZipMiddleware, minimum_size=COMPRESSION_MIN_SIZE, compresslevel=GZIP_LEVEL
+    )
+app.add_middleware(MetricsMiddleware)
 
 # Configure CORS
 app.add_middleware(
@@ -34,8 +127,21 @@ app.include_router(dashboard.router, tags=["Dashboard"])
 app.include_router(reporting.router, tags=["Reporting"])
 app.include_router(inventory.router)
 app.include_router(users.router, tags=["Users"])
+app.include_router(cache.router, tags=["Cache"])
+app.include_router(jobs.router, tags=["Jobs"])
+app.include_router(events.router, tags=["Events"])
 
 
 @app.get("/")
 async def root():
     return {"message": "Equipment Management API is running"}
+
+
+@app.get("/health")
+async def health(db: Database = Depends(get_db)):
+    return {"status": "ok", "database": db.stats()}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
 from datetime import datetime, date
 from uuid import UUID
@@ -45,6 +45,7 @@ class EquipmentCreate(EquipmentBase):
 class Equipment(EquipmentBase):
     equipment_id: int
     location_id: Optional[int]
+    current_device_user_id: Optional[int] = None
     warranty_start_date: Optional[date]
     warranty_end_date: Optional[date]
     created_at: datetime
@@ -54,6 +55,13 @@ class Equipment(EquipmentBase):
         from_attributes = True
 
 
+class InventorySearch(BaseModel):
+    query: str = ""
+    limit: Optional[int] = Field(None, ge=1, le=200)
+    # equipment_id of the last row of the previous browse page
+    cursor: Optional[int] = None
+
+
 class AssignmentBase(BaseModel):
     equipment_id: int
     device_user_id: int
@@ -64,6 +72,15 @@ class AssignmentCreate(AssignmentBase):
     assignment_start_date: date
 
 
+class AssignmentBatchCreate(BaseModel):
+    items: List[AssignmentCreate] = Field(min_length=1, max_length=1000)
+
+
+class AssignmentBatchEnd(BaseModel):
+    assignment_ids: List[int] = Field(min_length=1, max_length=1000)
+    new_status: str = "Available"
+
+
 class Assignment(AssignmentBase):
     assignment_id: int
     assignment_start_date: date
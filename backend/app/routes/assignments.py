@@ -1,22 +1,38 @@
 from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional
-from datetime import date
-from ..models.schemas import Assignment, AssignmentCreate
-from ..config.database import supabase
+from typing import Optional
+from postgrest.exceptions import APIError
+from ..models.schemas import (
+    Assignment,
+    AssignmentBatchCreate,
+    AssignmentBatchEnd,
+    AssignmentCreate,
+)
+from ..config.conditional import bump_table_versions
+from ..config.database import Database, get_db
+from ..config.responses import OrjsonResponse
+from ..services.changes import equipment_changed
 
 router = APIRouter()
 
+# SQLSTATEs raised by the assignment functions in
+# migrations/002_assignment_procedures.sql
+RPC_ERROR_STATUS = {
+    "P0002": 404,  # no_data_found: equipment or assignment does not exist
+    "P0001": 400,  # raise_exception: equipment is not available
+}
 
-@router.get("/assignments", response_model=List[dict])
+
+@router.get("/assignments")
 async def list_assignments(
     device_user_id: Optional[int] = None,
     department_id: Optional[int] = None,
     status: Optional[str] = None,
+    db: Database = Depends(get_db),
 ):
     """
     Get all assignments with related equipment and user details.
     """
-    query = supabase.from_("equipment_assignments").select(
+    query = db.from_("equipment_assignments").select(
         """
             assignment_id,
             assignment_start_date,
@@ -49,143 +65,193 @@ async def list_assignments(
     if department_id:
         query = query.eq("device_user.department_id", department_id)
 
-    response = query.execute()
-
-    if response.error:
-        raise HTTPException(status_code=400, detail=str(response.error))
+    try:
+        response = await db.execute(query)
+    except APIError as e:
+        raise HTTPException(status_code=400, detail=e.message)
 
-    return response.data
+    return OrjsonResponse(response.data)
 
 
 @router.post("/assignments", response_model=Assignment)
-async def create_assignment(assignment: AssignmentCreate):
+async def create_assignment(
+    assignment: AssignmentCreate,
+    db: Database = Depends(get_db),
+):
     """
     Create a new assignment
-    """
-    # Check if equipment is available
-    equipment = (
-        supabase.table("equipment")
-        .select("status, location_id")
-        .eq("equipment_id", assignment.equipment_id)
-        .single()
-        .execute()
-    )
-
-    if equipment.error or not equipment.data:
-        raise HTTPException(status_code=404, detail="Equipment not found")
-
-    if equipment.data["status"] not in ["Available", "In Storage"]:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Equipment is not available (current status: {equipment.data['status']})",
-        )
 
+    The availability check, assignment insert, status update and history
+    record all happen in the create_assignment() database function, in one
+    transaction with the equipment row locked.
+    """
     try:
-        # Create assignment
-        assignment_response = (
-            supabase.table("equipment_assignments")
-            .insert(assignment.model_dump())
-            .execute()
+        response = await db.execute(
+            db.rpc(
+                "create_assignment",
+                {
+                    "p_equipment_id": assignment.equipment_id,
+                    "p_device_user_id": assignment.device_user_id,
+                    "p_assignment_start_date": assignment.assignment_start_date.isoformat(),
+                    "p_assignment_purpose": assignment.assignment_purpose,
+                    "p_change_made_by": 1,  # Assuming admin user_id=1, should be from auth
+                },
+            )
         )
-
-        # Update equipment status
-        equipment_update = (
-            supabase.table("equipment")
-            .update({"status": "In Use"})
-            .eq("equipment_id", assignment.equipment_id)
-            .execute()
+    except APIError as e:
+        raise HTTPException(
+            status_code=RPC_ERROR_STATUS.get(e.code, 400), detail=e.message
         )
 
-        # Create history record
-        history_record = {
+    bump_table_versions("equipment_assignments")
+    equipment_changed(
+        {
             "equipment_id": assignment.equipment_id,
-            "device_user_id": assignment.device_user_id,
-            "location_id": equipment.data["location_id"],
-            "status": "In Use",
-            "assignment_start_date": assignment.assignment_start_date,
-            "change_made_by": 1,  # Assuming admin user_id=1, should be from auth
-        }
-
-        history_response = (
-            supabase.table("equipment_history").insert(history_record).execute()
-        )
-
-        return assignment_response.data[0]
-
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+            "status": response.data["previous_status"],
+        },
+        {"equipment_id": assignment.equipment_id, "status": "In Use"},
+    )
+    return response.data["assignment"]
 
 
 @router.put("/assignments/{assignment_id}", response_model=Assignment)
-async def update_assignment(assignment_id: int, updated_data: dict):
+async def update_assignment(
+    assignment_id: int, updated_data: dict, db: Database = Depends(get_db)
+):
     """
     Update an existing assignment
     """
-    response = (
-        supabase.table("equipment_assignments")
-        .update(updated_data)
-        .eq("assignment_id", assignment_id)
-        .execute()
-    )
-
-    if response.error:
-        raise HTTPException(status_code=400, detail=str(response.error))
+    try:
+        response = await db.execute(
+            db.table("equipment_assignments")
+            .update(updated_data)
+            .eq("assignment_id", assignment_id)
+        )
+    except APIError as e:
+        raise HTTPException(status_code=400, detail=e.message)
 
     if not response.data:
         raise HTTPException(status_code=404, detail="Assignment not found")
 
+    bump_table_versions("equipment_assignments")
     return response.data[0]
 
 
 @router.delete("/assignments/{assignment_id}")
-async def end_assignment(assignment_id: int, new_status: str = "Available"):
+async def end_assignment(
+    assignment_id: int,
+    new_status: str = "Available",
+    db: Database = Depends(get_db),
+):
     """
     End an assignment
+
+    Runs as a single end_assignment() database function call that updates the
+    equipment status, records history and deletes the assignment atomically.
     """
-    # Get assignment details before deletion
-    assignment = (
-        supabase.table("equipment_assignments")
-        .select("*")
-        .eq("assignment_id", assignment_id)
-        .single()
-        .execute()
+    try:
+        response = await db.execute(
+            db.rpc(
+                "end_assignment",
+                {
+                    "p_assignment_id": assignment_id,
+                    "p_new_status": new_status,
+                    "p_change_made_by": 1,  # Assuming admin user_id=1, should be from auth
+                },
+            )
+        )
+    except APIError as e:
+        raise HTTPException(
+            status_code=RPC_ERROR_STATUS.get(e.code, 400), detail=e.message
+        )
+
+    bump_table_versions("equipment_assignments")
+    equipment_id = response.data["equipment_id"]
+    equipment_changed(
+        {"equipment_id": equipment_id, "status": response.data["previous_status"]},
+        {"equipment_id": equipment_id, "status": new_status},
     )
+    return {"message": "Assignment ended successfully"}
 
-    if assignment.error or not assignment.data:
-        raise HTTPException(status_code=404, detail="Assignment not found")
 
+def batch_summary(results: list, applied: str) -> dict:
+    succeeded = sum(1 for result in results if result["status"] == applied)
+    return {
+        applied: succeeded,
+        "failed": len(results) - succeeded,
+        "results": results,
+    }
+
+
+@router.post("/assignments/batch")
+async def create_assignments(
+    batch: AssignmentBatchCreate,
+    db: Database = Depends(get_db),
+):
+    """
+    Assign many devices in one request, e.g. a semester rollout.
+
+    The create_assignments() database function checks availability for the
+    whole batch and writes assignments, status updates and history with
+    multi-row statements in a single transaction. Items that fail a check are
+    skipped; the response has one result per item, in request order.
+    """
     try:
-        # Update equipment status
-        equipment_update = (
-            supabase.table("equipment")
-            .update({"status": new_status})
-            .eq("equipment_id", assignment.data["equipment_id"])
-            .execute()
+        response = await db.execute(
+            db.rpc(
+                "create_assignments",
+                {
+                    "p_items": [item.model_dump(mode="json") for item in batch.items],
+                    "p_change_made_by": 1,  # Assuming admin user_id=1, should be from auth
+                },
+            )
         )
+    except APIError as e:
+        raise HTTPException(status_code=400, detail=e.message)
 
-        # Create history record
-        history_record = {
-            "equipment_id": assignment.data["equipment_id"],
-            "device_user_id": assignment.data["device_user_id"],
-            "status": new_status,
-            "assignment_start_date": assignment.data["assignment_start_date"],
-            "assignment_end_date": date.today(),
-            "change_made_by": 1,  # Assuming admin user_id=1, should be from auth
-        }
-
-        history_response = (
-            supabase.table("equipment_history").insert(history_record).execute()
-        )
+    bump_table_versions("equipment_assignments")
+    for result in response.data:
+        if result["status"] == "created":
+            equipment_id = result["assignment"]["equipment_id"]
+            equipment_changed(
+                {"equipment_id": equipment_id, "status": result["previous_status"]},
+                {"equipment_id": equipment_id, "status": "In Use"},
+            )
+    return batch_summary(response.data, "created")
 
-        # Delete the assignment
-        delete_response = (
-            supabase.table("equipment_assignments")
-            .delete()
-            .eq("assignment_id", assignment_id)
-            .execute()
-        )
 
-        return {"message": "Assignment ended successfully"}
+@router.post("/assignments/batch/end")
+async def end_assignments(
+    batch: AssignmentBatchEnd,
+    db: Database = Depends(get_db),
+):
+    """
+    End many assignments in one request, e.g. collecting devices back at the
+    end of a semester. Runs as a single end_assignments() database call with
+    one result per assignment id, in request order.
+    """
+    try:
+        response = await db.execute(
+            db.rpc(
+                "end_assignments",
+                {
+                    "p_assignment_ids": batch.assignment_ids,
+                    "p_new_status": batch.new_status,
+                    "p_change_made_by": 1,  # Assuming admin user_id=1, should be from auth
+                },
+            )
+        )
+    except APIError as e:
+        raise HTTPException(status_code=400, detail=e.message)
 
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    bump_table_versions("equipment_assignments")
+    for result in response.data:
+        if result["status"] == "ended":
+            equipment_changed(
+                {
+                    "equipment_id": result["equipment_id"],
+                    "status": result["previous_status"],
+                },
+                {"equipment_id": result["equipment_id"], "status": batch.new_status},
+            )
+    return batch_summary(response.data, "ended")
@@ -1,25 +1,41 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Optional
-from ..config.database import supabase
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from ..config.cache import Cache, get_cache
+from ..config.conditional import conditional_get
+from ..config.database import Database, get_db
 
 router = APIRouter()
 
 
-@router.get("/buildings", response_model=List[dict])
-async def get_buildings():
-    try:
-        response = supabase.from_("buildings").select("*").execute()
+@router.get(
+    "/buildings",
+    dependencies=[
+        Depends(conditional_get("buildings", cache_control="private, max-age=300"))
+    ],
+)
+async def get_buildings(
+    db: Database = Depends(get_db), cache: Cache = Depends(get_cache)
+):
+    async def load():
+        response = await db.execute(db.from_("buildings").select("*"))
         return response.data
 
+    try:
+        return await cache.get_or_load("buildings", "all", load)
+
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get("/buildings/{building_id}", response_model=dict)
-async def get_building(building_id: int):
-    try:
-        response = (
-            supabase.from_("buildings")
+@router.get("/buildings/{building_id}")
+async def get_building(
+    building_id: int,
+    db: Database = Depends(get_db),
+    cache: Cache = Depends(get_cache),
+):
+    async def load():
+        response = await db.execute(
+            db.from_("buildings")
             .select(
                 """
                 *,
@@ -33,10 +49,11 @@ async def get_building(building_id: int):
             )
             .eq("building_id", building_id)
             .single()
-            .execute()
         )
-
         return response.data
 
+    try:
+        return await cache.get_or_load("buildings", str(building_id), load)
+
     except Exception as e:
         raise HTTPException(status_code=404, detail="Building not found")
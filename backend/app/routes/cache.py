@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException
+from ..config.cache import Cache, get_cache
+from ..config.conditional import bump_table_versions
+
+router = APIRouter()
+
+# Cached responses that embed data from another namespace: building details
+# include their locations and the location list includes building names.
+CACHE_NAMESPACES = {
+    "buildings": ("buildings", "locations"),
+    "locations": ("locations", "buildings"),
+    "departments": ("departments",),
+}
+
+
+@router.get("/cache/stats")
+async def get_cache_stats(cache: Cache = Depends(get_cache)):
+    return await cache.stats()
+
+
+@router.delete("/cache/{namespace}")
+async def invalidate_cache(namespace: str, cache: Cache = Depends(get_cache)):
+    """
+    Drop cached reference data after buildings, locations or departments are
+    edited outside this API (e.g. in the Supabase dashboard).
+
+    With the default memory cache backend each worker process caches on its
+    own and only the worker handling this request is cleared; the others
+    catch up within CACHE_TTL. Use CACHE_BACKEND=redis to clear every worker.
+    """
+    if namespace not in CACHE_NAMESPACES:
+        raise HTTPException(status_code=404, detail="Unknown cache namespace")
+
+    await cache.invalidate(*CACHE_NAMESPACES[namespace])
+    bump_table_versions(*CACHE_NAMESPACES[namespace])
+    return {"message": f"Invalidated {', '.join(CACHE_NAMESPACES[namespace])}"}
@@ -1,99 +1,46 @@
-from fastapi import APIRouter, HTTPException
-from ..config.database import supabase
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal
+from ..config.database import Database, get_db
+from ..services.dashboard_snapshot import DashboardSnapshot, get_dashboard_snapshot
 
 router = APIRouter()
 
+# Groupings supported by the equipment_distribution() database function
+# (see migrations/001_equipment_distribution.sql).
+Distribution = Literal["building", "manufacturer", "form_factor", "status"]
 
-@router.get("/dashboard/devices-by-building")
-async def get_devices_by_building():
-    try:
-        # First get equipment with location_id
-        equipment_response = (
-            supabase.from_("equipment").select("*, location_id").execute()
-        )
-
-        # Get all locations with building info
-        locations_response = (
-            supabase.from_("locations").select("*, buildings!inner(*)").execute()
-        )
-
-        print("Equipment data:", equipment_response.data)  # Debug log
-        print("Locations data:", locations_response.data)  # Debug log
-
-        # Create a location lookup dictionary
-        location_building_map = {
-            loc["location_id"]: loc["buildings"]["building_name"]
-            for loc in locations_response.data
-            if loc.get("buildings")
-        }
 
-        # Count devices per building
-        building_counts = {}
-        for device in equipment_response.data:
-            if device.get("location_id"):
-                building_name = location_building_map.get(
-                    device["location_id"], "Unassigned"
-                )
-                building_counts[building_name] = (
-                    building_counts.get(building_name, 0) + 1
-                )
-
-        # Sort by count for better visualization
-        sorted_data = sorted(
-            [{"name": k, "value": v} for k, v in building_counts.items()],
-            key=lambda x: x["value"],
-            reverse=True,
-        )
-
-        print("Transformed data:", sorted_data)  # Debug log
-
-        return {"type": "building_distribution", "data": sorted_data}
+@router.get("/dashboard/distribution")
+async def get_distribution(
+    by: Distribution,
+    db: Database = Depends(get_db),
+    snapshot: DashboardSnapshot = Depends(get_dashboard_snapshot),
+):
+    try:
+        return await snapshot.distribution(db, by)
     except Exception as e:
-        print(f"Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/dashboard/devices-by-manufacturer")
-async def get_devices_by_manufacturer():
-    try:
-        response = supabase.from_("equipment").select("manufacturer").execute()
+@router.get("/dashboard/devices-by-building")
+async def get_devices_by_building(
+    db: Database = Depends(get_db),
+    snapshot: DashboardSnapshot = Depends(get_dashboard_snapshot),
+):
+    return await get_distribution("building", db, snapshot)
 
-        manufacturer_counts = {}
-        for device in response.data:
-            if device.get("manufacturer"):
-                manufacturer_counts[device["manufacturer"]] = (
-                    manufacturer_counts.get(device["manufacturer"], 0) + 1
-                )
 
-        return {
-            "type": "manufacturer_distribution",
-            "data": [
-                {"name": manufacturer, "value": count}
-                for manufacturer, count in manufacturer_counts.items()
-            ],
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+@router.get("/dashboard/devices-by-manufacturer")
+async def get_devices_by_manufacturer(
+    db: Database = Depends(get_db),
+    snapshot: DashboardSnapshot = Depends(get_dashboard_snapshot),
+):
+    return await get_distribution("manufacturer", db, snapshot)
 
 
 @router.get("/dashboard/devices-by-form-factor")
-async def get_devices_by_form_factor():
-    try:
-        response = supabase.from_("equipment").select("form_factor").execute()
-
-        form_factor_counts = {}
-        for device in response.data:
-            if device.get("form_factor"):
-                form_factor_counts[device["form_factor"]] = (
-                    form_factor_counts.get(device["form_factor"], 0) + 1
-                )
-
-        return {
-            "type": "form_factor_distribution",
-            "data": [
-                {"name": form_factor, "value": count}
-                for form_factor, count in form_factor_counts.items()
-            ],
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def get_devices_by_form_factor(
+    db: Database = Depends(get_db),
+    snapshot: DashboardSnapshot = Depends(get_dashboard_snapshot),
+):
+    return await get_distribution("form_factor", db, snapshot)
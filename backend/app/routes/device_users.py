@@ -1,18 +1,34 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
-from ..config.database import supabase
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from ..config.conditional import conditional_get
+from ..config.database import Database, get_db
 
 router = APIRouter()
 
 
-@router.get("/device-users", response_model=List[dict])
+@router.get(
+    "/device-users",
+    dependencies=[
+        Depends(
+            conditional_get(
+                "device_users",
+                "departments",
+                "employment_types",
+                # device_count changes with every assignment
+                "equipment_assignments",
+                cache_control="private, no-cache",
+            )
+        )
+    ],
+)
 async def get_device_users(
     department_id: Optional[int] = None,
     employment_type_id: Optional[int] = None,
     search: Optional[str] = None,
+    db: Database = Depends(get_db),
 ):
     try:
-        query = supabase.from_("device_users").select(
+        query = db.from_("device_users").select(
             """
                 *,
                 department:departments (
@@ -38,18 +54,18 @@ async def get_device_users(
                 f"email.ilike.%{search}%"
             )
 
-        response = query.execute()
+        response = await db.execute(query)
         return response.data
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get("/device-users/{device_user_id}", response_model=dict)
-async def get_device_user(device_user_id: int):
+@router.get("/device-users/{device_user_id}")
+async def get_device_user(device_user_id: int, db: Database = Depends(get_db)):
     try:
-        response = (
-            supabase.from_("device_users")
+        response = await db.execute(
+            db.from_("device_users")
             .select(
                 """
                 *,
@@ -75,7 +91,6 @@ async def get_device_user(device_user_id: int):
             )
             .eq("device_user_id", device_user_id)
             .single()
-            .execute()
         )
 
         return response.data
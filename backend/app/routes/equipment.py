@@ -1,93 +1,421 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
+import asyncio
+import os
+from datetime import date, datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from typing import List, Literal, Optional, Tuple
+from postgrest.exceptions import APIError
 from ..models.schemas import Equipment, EquipmentCreate
-from ..config.database import supabase
+from ..config.conditional import conditional_get
+from ..config.database import Database, get_db
+from ..services.changes import equipment_changed
+from ..services.dashboard_snapshot import TRACKED_COLUMNS
+from ..services.equipment_import import IMPORT_BATCH_SIZE, import_equipment
+from ..services.loader import DataLoaders, get_loaders
 import logging
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
-@router.get("/equipment")
-async def get_equipment():
-    try:
-        response = (
-            supabase.from_("equipment")
-            .select(
-                """
-                *,
-                equipment_assignments (
-                    device_users (
-                        first_name,
-                        last_name
-                    )
-                ),
-                locations (
-                    buildings (
-                        building_name
+# PostgREST select fragment backing each field of the equipment list.
+# equipment_id is always fetched because it doubles as the page cursor.
+EQUIPMENT_LIST_FIELDS = {
+    "equipment_id": "equipment_id",
+    "asset_tag": "asset_tag",
+    "device_name": "device_name",
+    "manufacturer": "manufacturer",
+    "model": "model",
+    "form_factor": "form_factor",
+    "status": "status",
+    # Denormalised current assignee (migrations/005_current_assignee.sql)
+    "assigned_to": """
+        assigned_to:device_users!current_device_user_id (
+            first_name,
+            last_name
+        )
+    """,
+    "location": """
+        locations (
+            buildings (
+                building_name
+            ),
+            floor_number,
+            room_number
+        )
+    """,
+}
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return list(EQUIPMENT_LIST_FIELDS)
+
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in EQUIPMENT_LIST_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+
+    if "equipment_id" not in requested:
+        requested.insert(0, "equipment_id")
+    return requested
+
+
+def format_equipment_row(item: dict, selected: List[str]) -> dict:
+    """Flatten the location; every other field is returned as selected."""
+    equipment_data = {}
+    for field in selected:
+        if field == "location":
+            location = item.get("locations")
+            equipment_data["location"] = (
+                {
+                    "building_name": (location.get("buildings") or {}).get(
+                        "building_name"
                     ),
-                    floor_number,
-                    room_number
-                )
-            """
+                    "floor_number": location.get("floor_number"),
+                    "room_number": location.get("room_number"),
+                }
+                if location
+                else None
             )
-            .execute()
-        )
-
-        # Transform the data to include the latest assignment and location
-        equipment_list = []
-        for item in response.data:
-            # Get current assignment if exists
-            current_assignment = None
-            if item.get("equipment_assignments"):
-                # Get the most recent assignment
-                current_assignment = sorted(
-                    item["equipment_assignments"],
-                    key=lambda x: x.get("assignment_start_date", ""),
-                    reverse=True,
-                )[0]
-
-            # Format the data
-            equipment_data = {
-                "equipment_id": item.get("equipment_id"),
-                "asset_tag": item.get("asset_tag"),
-                "device_name": item.get("device_name"),
-                "manufacturer": item.get("manufacturer"),
-                "model": item.get("model"),
-                "form_factor": item.get("form_factor"),
-                "status": item.get("status"),
-                "assigned_to": (
-                    current_assignment.get("device_users")
-                    if current_assignment
-                    else None
-                ),
-                "location": (
-                    {
-                        "building_name": item.get("locations", {})
-                        .get("buildings", {})
-                        .get("building_name"),
-                        "floor_number": item.get("locations", {}).get("floor_number"),
-                        "room_number": item.get("locations", {}).get("room_number"),
-                    }
-                    if item.get("locations")
-                    else None
-                ),
-            }
-            equipment_list.append(equipment_data)
-
-        return equipment_list
+        else:
+            equipment_data[field] = item.get(field)
+    return equipment_data
+
+
+@router.get(
+    "/equipment",
+    dependencies=[
+        Depends(
+            conditional_get(
+                "equipment",
+                "equipment_assignments",
+                "device_users",
+                "locations",
+                "buildings",
+                cache_control="private, no-cache",
+            )
+        )
+    ],
+)
+async def get_equipment(
+    cursor: Optional[int] = Query(
+        None, description="Return equipment with an equipment_id after this one"
+    ),
+    limit: int = Query(100, ge=1, le=1000),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated subset of fields to return"
+    ),
+    db: Database = Depends(get_db),
+):
+    selected = parse_fields(fields)
+
+    try:
+        query = (
+            db.from_("equipment")
+            .select(",".join(EQUIPMENT_LIST_FIELDS[field] for field in selected))
+            .order("equipment_id")
+            .limit(limit + 1)
+        )
+        if cursor is not None:
+            query = query.gt("equipment_id", cursor)
+
+        response = await db.execute(query)
+
+        # One extra row was requested to tell whether another page exists
+        rows = response.data[:limit]
+        next_cursor = rows[-1]["equipment_id"] if len(response.data) > limit else None
+
+        equipment_list = [format_equipment_row(item, selected) for item in rows]
+        return {"data": equipment_list, "next_cursor": next_cursor}
 
     except Exception as e:
-        print(f"Error: {str(e)}")
+        logger.exception("Equipment list failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/equipment/{equipment_id}", response_model=dict)
-async def get_equipment_detail(equipment_id: int):
+# Rows changed within this window before a client's cursor are sent again, so
+# writes whose transaction committed after a later one was already read are
+# not missed (updated_at is set when the transaction starts). It also absorbs
+# clock skew between the API and the database, as caught-up cursors are
+# based on the API's clock.
+CHANGES_OVERLAP_SECONDS = float(os.getenv("CHANGES_OVERLAP_SECONDS", "30"))
+
+
+def parse_timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def format_cursor_timestamp(at: datetime) -> str:
+    return f"{at.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')}Z"
+
+
+def format_changes_cursor(
+    at: datetime, equipment_id: int = 0, floor: Optional[datetime] = None
+) -> str:
+    """
+    ``<UTC timestamp>Z|<equipment_id>``, safe in a query string unencoded.
+    A page ending inside the overlap window adds ``|<floor>Z``, the point
+    the caught-up page resumes from so late commits behind it are re-read.
+    """
+    cursor = f"{format_cursor_timestamp(at)}|{equipment_id}"
+    if floor is not None and floor < at:
+        cursor += f"|{format_cursor_timestamp(floor)}"
+    return cursor
+
+
+def restore_offset(timestamp: str) -> str:
+    """An offset's "+" arrives as a space when the client did not encode it."""
+    return timestamp.replace(" ", "+") if "T" in timestamp else timestamp
+
+
+def parse_changes_cursor(cursor: str) -> Tuple[datetime, int, datetime]:
+    """(timestamp, equipment_id, floor); the floor defaults to the timestamp."""
+    timestamp, _, rest = cursor.partition("|")
+    equipment_id, _, floor = rest.partition("|")
+    try:
+        at = parse_timestamp(restore_offset(timestamp))
+        return (
+            at,
+            int(equipment_id),
+            parse_timestamp(restore_offset(floor)) if floor else at,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid changes cursor")
+
+
+def caught_up_at() -> datetime:
+    """Writes older than this have committed, so a caught-up client read them."""
+    return datetime.now(timezone.utc) - timedelta(seconds=CHANGES_OVERLAP_SECONDS)
+
+
+def changes_reset(next_cursor: str) -> dict:
+    return {
+        "data": [],
+        "deleted": [],
+        "next_cursor": next_cursor,
+        "has_more": False,
+        "reset": True,
+    }
+
+
+@router.get(
+    "/equipment/changes",
+    dependencies=[
+        Depends(
+            conditional_get(
+                "equipment",
+                "equipment_assignments",
+                "equipment_tombstones",
+                "device_users",
+                "locations",
+                "buildings",
+                cache_control="private, no-cache",
+            )
+        )
+    ],
+)
+async def get_equipment_changes(
+    since: Optional[str] = Query(
+        None, description="next_cursor from the previous call"
+    ),
+    limit: int = Query(1000, ge=1, le=5000),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated subset of fields to return"
+    ),
+    db: Database = Depends(get_db),
+):
     """
-    Get detailed equipment information including location, assignment history, and current status.
+    Equipment inserted, updated or deleted since a cursor, for clients keeping
+    a local copy of the /equipment list.
+
+    Without ``since`` only a starting cursor is returned, with ``reset``
+    set: take it before loading the full list, then poll with it. ``data``
+    rows (shaped like /equipment rows, plus updated_at) are upserts and
+    ``deleted`` lists removed equipment_ids; applying either twice is
+    harmless, as rows near the cursor may be sent again. Keep calling with
+    ``next_cursor`` while ``has_more`` is true.
     """
-    response = (
-        supabase.from_("equipment")
+    selected = parse_fields(fields)
+    columns = ",".join(
+        [*(EQUIPMENT_LIST_FIELDS[field] for field in selected), "updated_at"]
+    )
+
+    if since is None:
+        return changes_reset(format_changes_cursor(caught_up_at()))
+
+    since_at, since_id, since_floor = parse_changes_cursor(since)
+    # Compared as stored, in UTC
+    since_timestamp = since_at.astimezone(timezone.utc).isoformat()
+
+    try:
+        response, tombstones = await asyncio.gather(
+            db.execute(
+                db.from_("equipment")
+                .select(columns)
+                .or_(
+                    f'updated_at.gt."{since_timestamp}",'
+                    f'and(updated_at.eq."{since_timestamp}",equipment_id.gt.{since_id})'
+                )
+                .order("updated_at")
+                .order("equipment_id")
+                .limit(limit + 1)
+            ),
+            db.execute(
+                db.table("equipment_tombstones")
+                .select("equipment_id", "deleted_at")
+                .gt("deleted_at", since_timestamp)
+            ),
+        )
+    except APIError as e:
+        logger.exception("Equipment changes failed")
+        raise HTTPException(status_code=500, detail=e.message)
+
+    rows = response.data[:limit]
+    has_more = len(response.data) > limit
+    deleted = tombstones.data
+    if has_more:
+        # Deletions are sent with the page covering their time
+        last = rows[-1]
+        page_end = parse_timestamp(last["updated_at"])
+        deleted = [
+            row for row in deleted if parse_timestamp(row["deleted_at"]) <= page_end
+        ]
+        # Rows up to the floor have committed and been sent; a page ending
+        # inside the overlap window leaves rows that may still commit behind
+        # it, which the caught-up page goes back for
+        floor = min(page_end, max(since_floor, caught_up_at()))
+        next_cursor = format_changes_cursor(page_end, last["equipment_id"], floor)
+    else:
+        # Caught up: continue from the overlap window before now, so quiet
+        # periods are passed, but never step behind the floor of ``since``
+        resume_at = max(caught_up_at(), since_floor)
+        next_cursor = format_changes_cursor(
+            resume_at, since_id if resume_at == since_at else 0
+        )
+
+    return {
+        "data": [
+            {**format_equipment_row(item, selected), "updated_at": item["updated_at"]}
+            for item in rows
+        ],
+        "deleted": [row["equipment_id"] for row in deleted],
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+        "reset": False,
+    }
+
+
+HISTORY_COLUMNS = (
+    "history_id",
+    "status",
+    "location_id",
+    "device_user_id",
+    "assignment_start_date",
+    "assignment_end_date",
+    "change_date",
+    "change_made_by",
+)
+
+
+async def add_history_names(loaders: DataLoaders, rows: List[dict]) -> List[dict]:
+    """
+    Add the user_name, location_name and changed_by_name the history view
+    shows, loading only the rows the history refers to.
+    """
+    users, locations, changed_by = await asyncio.gather(
+        loaders.table(
+            "device_users", "device_user_id", "device_user_id,first_name,last_name"
+        ).load_many(row["device_user_id"] for row in rows),
+        loaders.table(
+            "locations", "location_id", "location_id,building_id,room_number"
+        ).load_many(row["location_id"] for row in rows),
+        loaders.table("app_users", "user_id", "user_id,first_name,last_name").load_many(
+            row["change_made_by"] for row in rows
+        ),
+    )
+    buildings = await loaders.table(
+        "buildings", "building_id", "building_id,building_name"
+    ).load_many(location["building_id"] for location in locations.values() if location)
+
+    def full_name(person: Optional[dict]) -> Optional[str]:
+        return f"{person['first_name']} {person['last_name']}" if person else None
+
+    for row in rows:
+        location = locations.get(row["location_id"])
+        building = buildings.get(location["building_id"]) if location else None
+        row["user_name"] = full_name(users.get(row["device_user_id"]))
+        row["location_name"] = (
+            f"{building['building_name'] if building else 'Unknown Building'}, "
+            f"Room {location['room_number']}"
+            if location
+            else None
+        )
+        row["changed_by_name"] = full_name(changed_by.get(row["change_made_by"]))
+    return rows
+
+
+def history_cursor(row: dict) -> str:
+    return f"{row['change_date']}|{row['history_id']}"
+
+
+def build_history_query(
+    db: Database,
+    equipment_id: int,
+    cursor: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+):
+    """
+    Newest-first history of one piece of equipment, served by the
+    (equipment_id, change_date, history_id) index from
+    migrations/004_equipment_history_index.sql.
+    """
+    query = (
+        db.table("equipment_history")
+        .select(*HISTORY_COLUMNS)
+        .eq("equipment_id", equipment_id)
+        .order("change_date", desc=True)
+        .order("history_id", desc=True)
+    )
+    if start_date:
+        query = query.gte("change_date", start_date.isoformat())
+    if end_date:
+        query = query.lt("change_date", (end_date + timedelta(days=1)).isoformat())
+    if cursor:
+        change_date, _, history_id = cursor.rpartition("|")
+        try:
+            # Only a parsed timestamp and id go into the filter string
+            change_date = datetime.fromisoformat(restore_offset(change_date))
+            change_date, history_id = change_date.isoformat(), int(history_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid history cursor")
+
+        query = query.or_(
+            f'change_date.lt."{change_date}",'
+            f'and(change_date.eq."{change_date}",history_id.lt.{history_id})'
+        )
+    return query
+
+
+@router.get("/equipment/{equipment_id}")
+async def get_equipment_detail(
+    equipment_id: int,
+    history_limit: int = Query(
+        10, ge=0, le=100, description="Latest history entries to include"
+    ),
+    db: Database = Depends(get_db),
+    loaders: DataLoaders = Depends(get_loaders),
+):
+    """
+    Get detailed equipment information including location, the current
+    assignment and the latest history entries. Older history is paged through
+    /equipment/{equipment_id}/history starting at ``history_next_cursor``.
+    """
+    detail_query = (
+        db.from_("equipment")
         .select(
             """
             *,
@@ -112,55 +440,148 @@ async def get_equipment_detail(equipment_id: int):
                         department_name
                     )
                 )
-            ),
-            history:equipment_history (
-                history_id,
-                status,
-                location_id,
-                device_user_id,
-                assignment_start_date,
-                assignment_end_date,
-                change_date
             )
         """
         )
         .eq("equipment_id", equipment_id)
-        .single()
-        .execute()
     )
 
-    if response.error:
+    async def latest_history():
+        # One extra row tells whether there is more to page through
+        history = await db.execute(
+            build_history_query(db, equipment_id).limit(history_limit + 1)
+        )
+        await add_history_names(loaders, history.data[:history_limit])
+        return history
+
+    # The names are looked up while the detail query is still running
+    response, history = await asyncio.gather(db.execute(detail_query), latest_history())
+
+    if not response.data:
         raise HTTPException(status_code=404, detail="Equipment not found")
 
-    return response.data
+    equipment = response.data[0]
+    assignments = equipment.pop("current_assignment") or []
+    equipment["current_assignment"] = max(
+        assignments,
+        key=lambda assignment: assignment.get("assignment_start_date") or "",
+        default=None,
+    )
+    equipment["history"] = history.data[:history_limit]
+    equipment["history_next_cursor"] = (
+        history_cursor(history.data[history_limit - 1])
+        if len(history.data) > history_limit and history_limit
+        else None
+    )
+    return equipment
+
+
+@router.get("/equipment/{equipment_id}/history")
+async def get_equipment_history(
+    equipment_id: int,
+    cursor: Optional[str] = Query(
+        None, description="next_cursor from the previous page"
+    ),
+    limit: int = Query(50, ge=1, le=500),
+    start_date: Optional[date] = Query(None, description="Changes on or after"),
+    end_date: Optional[date] = Query(None, description="Changes on or before"),
+    db: Database = Depends(get_db),
+    loaders: DataLoaders = Depends(get_loaders),
+):
+    """
+    Page through an equipment's history, newest first, optionally limited to
+    a date range.
+    """
+    query = build_history_query(db, equipment_id, cursor, start_date, end_date)
+    response = await db.execute(query.limit(limit + 1))
+
+    rows = response.data[:limit]
+    return {
+        "data": await add_history_names(loaders, rows),
+        "next_cursor": history_cursor(rows[-1]) if len(response.data) > limit else None,
+    }
 
 
 @router.post("/equipment", response_model=Equipment)
-async def create_equipment(equipment: EquipmentCreate):
+async def create_equipment(
+    equipment: EquipmentCreate,
+    db: Database = Depends(get_db),
+):
     """
     Create new equipment
     """
-    response = supabase.table("equipment").insert(equipment.model_dump()).execute()
-
-    if response.error:
-        raise HTTPException(status_code=400, detail=str(response.error))
+    try:
+        response = await db.execute(
+            db.table("equipment").insert(equipment.model_dump())
+        )
+    except APIError as e:
+        raise HTTPException(status_code=400, detail=e.message)
 
+    equipment_changed(None, response.data[0])
     return response.data[0]
 
 
+@router.post("/equipment/import")
+async def bulk_import_equipment(
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "ndjson"]] = Query(
+        None, description="Defaults to the upload's file extension"
+    ),
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=5000),
+    db: Database = Depends(get_db),
+):
+    """
+    Bulk import equipment from a CSV (with a header row) or NDJSON upload.
+    Rows are validated against EquipmentCreate and inserted in batches; the
+    response lists every rejected row with its line number.
+    """
+    file_format = format
+    if file_format is None:
+        filename = (file.filename or "").lower()
+        if filename.endswith(".csv"):
+            file_format = "csv"
+        elif filename.endswith((".ndjson", ".jsonl")):
+            file_format = "ndjson"
+        else:
+            raise HTTPException(
+                status_code=400, detail="Could not detect import format"
+            )
+
+    return await import_equipment(db, file.file, file_format, batch_size)
+
+
 @router.put("/equipment/{equipment_id}", response_model=Equipment)
-async def update_equipment(equipment_id: int, equipment: dict):
+async def update_equipment(
+    equipment_id: int,
+    equipment: dict,
+    db: Database = Depends(get_db),
+):
     """
     Update equipment details
     """
-    response = (
-        supabase.table("equipment")
-        .update(equipment)
-        .eq("equipment_id", equipment_id)
-        .execute()
-    )
+    # The dashboard counters need the old values of any column they track
+    before = None
+    if any(column in equipment for column in TRACKED_COLUMNS):
+        previous = await db.execute(
+            db.table("equipment")
+            .select(", ".join(TRACKED_COLUMNS))
+            .eq("equipment_id", equipment_id)
+        )
+        before = previous.data[0] if previous.data else None
 
-    if response.error:
-        raise HTTPException(status_code=400, detail=str(response.error))
+    try:
+        response = await db.execute(
+            db.table("equipment").update(equipment).eq("equipment_id", equipment_id)
+        )
+    except APIError as e:
+        raise HTTPException(status_code=400, detail=e.message)
 
-    return response.data[0]
+    if not response.data:
+        raise HTTPException(status_code=404, detail="Equipment not found")
+
+    after = response.data[0]
+    if before is None:
+        # No tracked column changed, so the dashboard buckets stay put
+        before = {column: after.get(column) for column in TRACKED_COLUMNS}
+    equipment_changed({**before, "equipment_id": equipment_id}, after)
+    return after
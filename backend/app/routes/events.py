@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from ..services.change_feed import ChangeFeed, ChangeFeedFull, get_change_feed
+
+router = APIRouter()
+
+
+@router.get("/events")
+async def stream_events(feed: ChangeFeed = Depends(get_change_feed)):
+    """
+    Server-sent events replacing the dashboard and inventory polling:
+
+    - ``dashboard`` on connect, with the current dashboard counters
+    - ``changes`` with the ids of equipment changed since the last event
+      (coalesced over a short window) and the updated counters
+    - ``resync`` instead of ``changes`` when the client fell too far behind;
+      reload the equipment list
+    """
+    try:
+        feed.check_capacity()
+    except ChangeFeedFull as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": "30"}
+        )
+
+    return StreamingResponse(
+        feed.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,58 +1,78 @@
-from fastapi import APIRouter, HTTPException
-from supabase import create_client
-import os
-from dotenv import load_dotenv
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Query
+from ..config.database import Database, get_db
+from ..models.schemas import InventorySearch
+from ..services.autocomplete import (
+    AUTOCOMPLETE_COLUMNS,
+    AutocompleteIndex,
+    get_autocomplete_index,
+)
 
-load_dotenv()
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-# Initialize Supabase client
-supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+SEARCH_LIMIT = 50
 
 
 @router.post("/api/inventory/search")
-async def search_inventory(search_request: dict):
+async def search_inventory(
+    search_request: InventorySearch, db: Database = Depends(get_db)
+):
     try:
-        search_query = search_request.get("query", "").strip()
+        search_query = search_request.query.strip()
+        limit = search_request.limit or SEARCH_LIMIT
 
         if not search_query:
-            result = (
-                supabase.table("equipment")
-                .select(
-                    "equipment_id",
-                    "asset_tag",
-                    "serial_number",
-                    "device_name",
-                    "status",
-                    "form_factor",
-                    "updated_at",
-                )
-                .execute()
+            # Browse the inventory a page at a time, keyed on equipment_id
+            query = (
+                db.table("equipment")
+                .select(*AUTOCOMPLETE_COLUMNS)
+                .order("equipment_id")
+                .limit(limit + 1)
             )
-            return {"data": result.data}
-
-        # Corrected syntax for 'or' with the right condition format
-        result = (
-            supabase.table("equipment")
-            .select(
-                "equipment_id",
-                "asset_tag",
-                "serial_number",
-                "device_name",
-                "status",
-                "form_factor",
-                "updated_at",
-            )
-            .or_(
-                f"asset_tag.ilike.%{search_query}%,serial_number.ilike.%{search_query}%"
-            )
-            .execute()
+            if search_request.cursor is not None:
+                query = query.gt("equipment_id", search_request.cursor)
+
+            result = await db.execute(query)
+            rows = result.data[:limit]
+            return {
+                "data": rows,
+                "next_cursor": (
+                    rows[-1]["equipment_id"] if len(result.data) > limit else None
+                ),
+            }
+
+        # Ranked full-text/trigram search (migrations/003_search.sql)
+        result = await db.execute(
+            db.rpc("search_equipment", {"p_query": search_query, "p_limit": limit})
         )
 
         return {"data": result.data}
 
     except Exception as e:
-        print(f"Search error: {str(e)}")
+        logger.exception("Inventory search failed")
         raise HTTPException(
             status_code=500, detail=f"Failed to search inventory: {str(e)}"
         )
+
+
+@router.get("/api/inventory/autocomplete")
+async def autocomplete_inventory(
+    q: str = Query(..., min_length=1, description="Asset tag or serial number prefix"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Database = Depends(get_db),
+    index: AutocompleteIndex = Depends(get_autocomplete_index),
+):
+    """
+    Search-as-you-type over asset tags and serial numbers, answered from the
+    in-memory prefix index (loaded on first use).
+    """
+    try:
+        if not index.loaded:
+            await index.load(db)
+
+        return {"data": index.lookup(q, limit)}
+
+    except Exception as e:
+        logger.exception("Autocomplete lookup failed")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,43 @@
+import os
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from ..services.jobs import JobQueue, get_job_queue
+
+router = APIRouter()
+
+
+async def get_job_or_404(job_id: str, jobs: JobQueue) -> dict:
+    job = await jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/api/jobs")
+async def list_jobs(jobs: JobQueue = Depends(get_job_queue)):
+    """Most recently submitted jobs, newest first."""
+    return await jobs.recent()
+
+
+@router.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, jobs: JobQueue = Depends(get_job_queue)):
+    """Job status and progress (``processed`` of ``total`` rows)."""
+    job = await get_job_or_404(job_id, jobs)
+    if job["status"] == "succeeded":
+        job["result_url"] = f"/api/jobs/{job_id}/result"
+    return job
+
+
+@router.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str, jobs: JobQueue = Depends(get_job_queue)):
+    job = await get_job_or_404(job_id, jobs)
+    if job["status"] != "succeeded":
+        raise HTTPException(
+            status_code=409, detail=f"Job is {job['status']}, not finished"
+        )
+
+    path = jobs.result_path(job_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Job result has expired")
+
+    return FileResponse(path, media_type=job["media_type"], filename=job["filename"])
@@ -1,68 +1,83 @@
-from fastapi import APIRouter, HTTPException, Query
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import JSONResponse
 from typing import List, Optional
-from ..config.database import supabase
+from ..config.cache import Cache, get_cache
+from ..config.conditional import conditional_get
+from ..config.database import Database, get_db
 import logging
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
-@router.get("/locations")
-async def get_locations():
+# Reference data: browsers may reuse it for a few minutes without asking
+@router.get(
+    "/locations",
+    dependencies=[
+        Depends(
+            conditional_get(
+                "locations", "buildings", cache_control="private, max-age=300"
+            )
+        )
+    ],
+)
+async def get_locations(
+    db: Database = Depends(get_db), cache: Cache = Depends(get_cache)
+):
     try:
-        print("Attempting to fetch locations...")
-        # First get locations with building_id
-        locations_response = supabase.from_("locations").select("*").execute()
+        return await cache.get_or_load("locations", "all", lambda: load_locations(db))
 
-        # Then get all buildings
-        buildings_response = supabase.from_("buildings").select("*").execute()
+    except Exception as e:
+        logger.exception("Fetching locations failed")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-        print("Raw locations data:", locations_response.data)
-        print("Raw buildings data:", buildings_response.data)
 
-        # Create a buildings lookup dictionary
-        buildings_lookup = {
-            building["building_id"]: {
-                "building_name": building["building_name"],
-                "building_short_name": building["building_short_name"],
-            }
-            for building in buildings_response.data
-        }
+async def load_locations(db: Database) -> list:
+    # Locations and buildings are independent, so fetch both at once
+    locations_response, buildings_response = await asyncio.gather(
+        db.execute(db.from_("locations").select("*")),
+        db.execute(db.from_("buildings").select("*")),
+    )
 
-        # Transform the response to match the frontend's expected structure
-        transformed_data = []
-        for location in locations_response.data:
-            building_data = buildings_lookup.get(location["building_id"], {})
-            location_data = {
-                "location_id": location["location_id"],
-                "room_number": location["room_number"],
-                "floor_number": location["floor_number"],
-                "building": {
-                    "building_name": building_data.get(
-                        "building_name", "Unknown Building"
-                    ),
-                    "building_short_name": building_data.get(
-                        "building_short_name", "UNK"
-                    ),
-                },
-            }
-            transformed_data.append(location_data)
+    logger.debug(
+        "Fetched locations=%d buildings=%d",
+        len(locations_response.data),
+        len(buildings_response.data),
+    )
 
-        print("Transformed data:", transformed_data)
-        return transformed_data
+    # Create a buildings lookup dictionary
+    buildings_lookup = {
+        building["building_id"]: {
+            "building_name": building["building_name"],
+            "building_short_name": building["building_short_name"],
+        }
+        for building in buildings_response.data
+    }
 
-    except Exception as e:
-        print(f"Error type: {type(e)}")
-        print(f"Error details: {str(e)}")
-        print(f"Full error object: {repr(e)}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    # Transform the response to match the frontend's expected structure
+    transformed_data = []
+    for location in locations_response.data:
+        building_data = buildings_lookup.get(location["building_id"], {})
+        location_data = {
+            "location_id": location["location_id"],
+            "room_number": location["room_number"],
+            "floor_number": location["floor_number"],
+            "building": {
+                "building_name": building_data.get("building_name", "Unknown Building"),
+                "building_short_name": building_data.get("building_short_name", "UNK"),
+            },
+        }
+        transformed_data.append(location_data)
+
+    return transformed_data
 
 
-@router.get("/locations/{location_id}", response_model=dict)
-async def get_location(location_id: int):
+@router.get("/locations/{location_id}")
+async def get_location(location_id: int, db: Database = Depends(get_db)):
     try:
-        response = (
-            supabase.from_("locations")
+        response = await db.execute(
+            db.from_("locations")
             .select(
                 """
                 *,
@@ -75,7 +90,6 @@ async def get_location(location_id: int):
             )
             .eq("location_id", location_id)
             .single()
-            .execute()
         )
 
         return response.data
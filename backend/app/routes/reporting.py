@@ -1,41 +1,104 @@
-from fastapi import APIRouter, HTTPException
-from supabase import create_client, Client
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
+import logging
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from ..config.database import Database, get_db
+from ..config.responses import OrjsonResponse
+from ..services.equipment_columns import EquipmentColumns, get_equipment_columns
+from ..services.jobs import JobQueue, JobQueueFull, get_job_queue
+from ..services.report_export import (
+    EXPORT_FORMATS,
+    EXPORT_WRITERS,
+    REPORT_COLUMNS,
+    build_report_query,
+    parse_report_filters,
+)
 
 router = APIRouter()
-
-# Initialize Supabase client
-supabase: Client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+logger = logging.getLogger(__name__)
 
 
 @router.post("/api/reports/generate")
-async def generate_report(report_request: dict):
+async def generate_report(
+    report_request: dict,
+    db: Database = Depends(get_db),
+    jobs: JobQueue = Depends(get_job_queue),
+    columns: EquipmentColumns = Depends(get_equipment_columns),
+):
+    """
+    Generate an equipment report. With ``"format": "csv" | "ndjson" | "xlsx"``
+    in the request body the report is streamed as a file download, fetched
+    from the database a page at a time.
+
+    With ``"background": true`` the export (csv unless a format is given) runs
+    as a background job instead: the response is a 202 with the job, to be
+    polled at /api/jobs/{job_id} and downloaded from its result URL.
+
+    Filters take a value, a list of values or, on ids and dates, range
+    bounds (see services/report_export.py). JSON reports are answered from
+    the columnar equipment snapshot when NumPy is installed.
+    """
+    filters = report_request.get("filters") or {}
     try:
-        print("Received filters:", report_request.get("filters", {}))  # Debug print
+        conditions = parse_report_filters(filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    export_format = report_request.get("format")
+    if report_request.get("background"):
+        export_format = export_format or "csv"
+
+    if export_format:
+        if export_format == "excel":
+            export_format = "xlsx"
+        if export_format not in EXPORT_FORMATS:
+            raise HTTPException(
+                status_code=400, detail=f"Unsupported format: {export_format}"
+            )
 
-        filters = report_request.get("filters", {})
-        query = supabase.table("equipment").select(
-            "equipment_id", "device_name", "status", "form_factor", "updated_at"
+    if report_request.get("background"):
+        try:
+            job = await jobs.submit(
+                "report", {"filters": filters, "format": export_format}
+            )
+        except JobQueueFull as e:
+            raise HTTPException(
+                status_code=503, detail=str(e), headers={"Retry-After": "30"}
+            )
+
+        return OrjsonResponse(
+            status_code=202,
+            content=job,
+            headers={"Location": f"/api/jobs/{job['job_id']}"},
         )
 
-        # Apply filters
-        if filters.get("type"):
-            query = query.eq("form_factor", filters["type"])
-        if filters.get("status"):
-            query = query.eq("status", filters["status"])
+    if export_format:
+
+        media_type, extension = EXPORT_FORMATS[export_format]
+        pages = db.fetch_pages(lambda: build_report_query(db, filters), "equipment_id")
+        return StreamingResponse(
+            EXPORT_WRITERS[export_format](REPORT_COLUMNS, pages),
+            media_type=media_type,
+            headers={
+                "Content-Disposition": f'attachment; filename="equipment-report.{extension}"'
+            },
+        )
+
+    try:
+        logger.debug("Generating report filters=%s", filters)
 
-        result = query.execute()
-        print("Query result:", result.data)  # Debug print
+        if columns.available():
+            await columns.load(db)
+            data = columns.report(conditions)
+            logger.debug("Report rows=%d", len(data))
+            return OrjsonResponse(
+                {"status": "success", "data": data, "as_of": columns.as_of}
+            )
 
-        if not result.data:
-            print("No data found in the equipment table")  # Debug print
-            return {"status": "success", "data": []}
+        result = await db.execute(build_report_query(db, filters))
+        logger.debug("Report rows=%d", len(result.data))
 
-        return {"status": "success", "data": result.data}
+        return OrjsonResponse({"status": "success", "data": result.data})
 
     except Exception as e:
-        print(f"Debug - Error: {str(e)}")
+        logger.exception("Report generation failed")
         raise HTTPException(status_code=500, detail=str(e))
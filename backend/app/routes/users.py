@@ -1,80 +1,159 @@
-from fastapi import APIRouter, HTTPException
-from supabase import create_client
-import os
-from dotenv import load_dotenv
+import logging
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from ..config.cache import Cache, get_cache
+from ..config.conditional import bump_table_versions
+from ..config.database import Database, get_db
 
-load_dotenv()
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+SEARCH_LIMIT = 50
+
+# Sort orders for the user listing; device_count is the counter kept on
+# device_users by migrations/007_device_counts.sql
+USER_SORTS = {
+    "name": ("last_name", "first_name", "device_user_id"),
+    "device_count": ("device_count", "device_user_id"),
+}
+
+
+def format_user(user: dict, department: Optional[str]) -> dict:
+    return {
+        "user_id": user["device_user_id"],
+        "first_name": user["first_name"],
+        "last_name": user["last_name"],
+        "email": user["email"],
+        "department": department,
+        "device_count": user["device_count"],
+    }
 
 
 @router.get("/api/users/search")
-async def search_users(query: str = ""):
+async def search_users(
+    query: str = "",
+    limit: int = Query(SEARCH_LIMIT, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    department_id: Optional[int] = None,
+    min_devices: Optional[int] = Query(None, ge=0),
+    max_devices: Optional[int] = Query(None, ge=0),
+    sort: Optional[Literal["name", "device_count"]] = None,
+    desc: bool = False,
+    db: Database = Depends(get_db),
+):
+    """
+    Users with their device counts, filtered by department and device count.
+    With a ``query`` matches come in rank order, or in ``sort`` order when one
+    is given; without one users are sorted by name unless ``sort`` says
+    otherwise. Either way a page of ``limit`` users starts at ``offset``, with
+    ``next_offset`` set while there are more. Nulls sort last in both
+    directions.
+    """
     try:
-        # First get users
-        result = supabase.table("device_users").select(
+        if query.strip():
+            # Ranked full-text/trigram search (migrations/003_search.sql), with
+            # the filters applied before the limit (migrations/007_device_counts.sql)
+            result = await db.execute(
+                db.rpc(
+                    "search_device_users",
+                    {
+                        "p_query": query.strip(),
+                        # One extra row says whether there is another page
+                        "p_limit": limit + 1,
+                        "p_offset": offset,
+                        "p_department_id": department_id,
+                        "p_min_devices": min_devices,
+                        "p_max_devices": max_devices,
+                        "p_sort": sort,
+                        "p_desc": desc,
+                    },
+                )
+            )
+            users = [
+                format_user(user, user["department_name"])
+                for user in result.data[:limit]
+            ]
+            next_offset = offset + limit if len(result.data) > limit else None
+
+            return {"data": users, "next_offset": next_offset}
+
+        result = db.table("device_users").select(
             "device_user_id",
             "first_name",
             "last_name",
             "email",
+            "device_count",
             "departments(department_name)",
-            "equipment_assignments!left(*)",
         )
+        if department_id is not None:
+            result = result.eq("department_id", department_id)
+        if min_devices is not None:
+            result = result.gte("device_count", min_devices)
+        if max_devices is not None:
+            result = result.lte("device_count", max_devices)
+        for column in USER_SORTS[sort or "name"]:
+            result = result.order(column, desc=desc, nullsfirst=False)
 
-        if query:
-            result = result.or_(
-                f"first_name.ilike.%{query}%,"
-                f"last_name.ilike.%{query}%,"
-                f"email.ilike.%{query}%"
-            )
+        result = await db.execute(result.range(offset, offset + limit - 1))
 
-        result = result.execute()
+        users = [
+            format_user(user, (user["departments"] or {}).get("department_name"))
+            for user in result.data
+        ]
+        next_offset = offset + limit if len(users) == limit else None
 
-        # Format the response and calculate device count
-        users = []
-        for user in result.data:
-            device_count = len(
-                [a for a in user["equipment_assignments"] if a is not None]
-            )
-            users.append(
-                {
-                    "user_id": user["device_user_id"],
-                    "first_name": user["first_name"],
-                    "last_name": user["last_name"],
-                    "email": user["email"],
-                    "department": user["departments"]["department_name"],
-                    "device_count": device_count,
-                }
-            )
+        return {"data": users, "next_offset": next_offset}
+
+    except Exception as e:
+        logger.exception("User search failed")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        return {"data": users}
+
+@router.get("/api/users/departments")
+async def department_device_counts(
+    min_devices: Optional[int] = Query(None, ge=0),
+    db: Database = Depends(get_db),
+):
+    """Users and assigned devices per department, most devices first."""
+    try:
+        result = await db.execute(db.rpc("department_device_counts", {}))
+        departments = result.data or []
+        if min_devices is not None:
+            departments = [
+                department
+                for department in departments
+                if department["device_count"] >= min_devices
+            ]
+        return {"data": departments}
 
     except Exception as e:
-        print(f"Error: {str(e)}")
+        logger.exception("Department device counts failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/api/users/add")
-async def add_user(user: dict):
+async def add_user(
+    user: dict, db: Database = Depends(get_db), cache: Cache = Depends(get_cache)
+):
+    async def load_departments():
+        result = await db.execute(
+            db.table("departments").select("department_id, department_name")
+        )
+        return {row["department_name"]: row["department_id"] for row in result.data}
+
     try:
         # First, get department_id from department name
-        dept_result = (
-            supabase.table("departments")
-            .select("department_id")
-            .eq("department_name", user["department"])
-            .execute()
+        departments = await cache.get_or_load(
+            "departments", "by_name", load_departments
         )
+        department_id = departments.get(user["department"])
 
-        if not dept_result.data:
+        if department_id is None:
             raise HTTPException(status_code=400, detail="Invalid department")
 
-        department_id = dept_result.data[0]["department_id"]
-
         # Insert new user
-        result = (
-            supabase.table("device_users")
-            .insert(
+        result = await db.execute(
+            db.table("device_users").insert(
                 {
                     "first_name": user["first_name"],
                     "last_name": user["last_name"],
@@ -83,11 +162,11 @@ async def add_user(user: dict):
                     "employment_type_id": 1,  # Default employment type, adjust as needed
                 }
             )
-            .execute()
         )
+        bump_table_versions("device_users")
 
         return {"status": "success", "data": result.data[0]}
 
     except Exception as e:
-        print(f"Error: {str(e)}")
+        logger.exception("Adding user failed")
         raise HTTPException(status_code=500, detail=str(e))
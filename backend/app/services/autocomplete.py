@@ -0,0 +1,200 @@
+import asyncio
+import bisect
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from ..config.cache import MemoryCacheBackend
+from ..config.database import Database
+from .equipment_columns import REFRESH_OVERLAP_SECONDS
+
+logger = logging.getLogger(__name__)
+
+AUTOCOMPLETE_CACHE_SIZE = int(os.getenv("AUTOCOMPLETE_CACHE_SIZE", "256"))
+AUTOCOMPLETE_CACHE_TTL = float(os.getenv("AUTOCOMPLETE_CACHE_TTL", "60"))
+# How often rows changed outside this API are pulled in, as for the
+# equipment columns (services/equipment_columns.py)
+AUTOCOMPLETE_REFRESH_SECONDS = float(os.getenv("AUTOCOMPLETE_REFRESH_SECONDS", "30"))
+
+AUTOCOMPLETE_COLUMNS = (
+    "equipment_id",
+    "asset_tag",
+    "serial_number",
+    "device_name",
+    "status",
+    "form_factor",
+    "updated_at",
+)
+
+# Identifiers the prefix index is keyed on
+PREFIX_FIELDS = ("asset_tag", "serial_number")
+
+
+class AutocompleteIndex:
+    """
+    Sorted (identifier, equipment_id) array over asset tags and serial
+    numbers, answered with bisect so keystroke lookups never hit the
+    database. Kept current by equipment change notifications and refreshed
+    from updated_at for changes made elsewhere; recent lookups are memoised
+    in a small LRU that is cleared whenever the index changes.
+    """
+
+    _instance: Optional["AutocompleteIndex"] = None
+
+    def __init__(self):
+        self.rows: Dict[int, dict] = {}
+        self._keys: List[Tuple[str, int]] = []
+        self.results = MemoryCacheBackend(max_entries=AUTOCOMPLETE_CACHE_SIZE)
+        self.watermark: Optional[datetime] = None
+        self.loaded = False
+        self._load_lock = asyncio.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "AutocompleteIndex":
+        if cls._instance is None:
+            cls._instance = cls()
+
+        return cls._instance
+
+    @staticmethod
+    def _row_keys(row: dict) -> List[Tuple[str, int]]:
+        return [
+            (str(row[field]).lower(), row["equipment_id"])
+            for field in PREFIX_FIELDS
+            if row.get(field)
+        ]
+
+    async def load(self, db: Database) -> None:
+        async with self._load_lock:
+            if self.loaded:
+                return
+
+            rows: Dict[int, dict] = {}
+            async for page in db.fetch_pages(
+                lambda: db.table("equipment").select(*AUTOCOMPLETE_COLUMNS),
+                "equipment_id",
+            ):
+                rows.update((row["equipment_id"], row) for row in page)
+
+            self.rows = rows
+            self._keys = sorted(
+                key for row in rows.values() for key in self._row_keys(row)
+            )
+            self.watermark = None
+            for row in rows.values():
+                self._advance_watermark(row)
+            self.results.delete_prefix("")
+            self.loaded = True
+
+    async def refresh(self, db: Database) -> None:
+        """Pull in rows updated or deleted since the last load or refresh."""
+        if not self.loaded:
+            return await self.load(db)
+
+        since = datetime(1970, 1, 1)
+        if self.watermark is not None:
+            since = self.watermark - timedelta(seconds=REFRESH_OVERLAP_SECONDS)
+
+        async for page in db.fetch_pages(
+            lambda: db.table("equipment")
+            .select(*AUTOCOMPLETE_COLUMNS)
+            .gt("updated_at", since.isoformat()),
+            "equipment_id",
+        ):
+            for row in page:
+                self._upsert(row)
+
+        tombstones = await db.execute(
+            db.table("equipment_tombstones")
+            .select("equipment_id")
+            .gt("deleted_at", since.isoformat())
+        )
+        for tombstone in tombstones.data:
+            self._remove(tombstone["equipment_id"])
+        self.results.delete_prefix("")
+
+    async def run_refresh(self, interval: float = AUTOCOMPLETE_REFRESH_SECONDS):
+        """Background task started by the application lifespan hook."""
+        while True:
+            await asyncio.sleep(interval)
+            if not self.loaded:
+                continue
+            try:
+                await self.refresh(Database.get_instance())
+            except Exception:
+                logger.exception("Autocomplete refresh failed")
+
+    def _advance_watermark(self, row: dict) -> None:
+        if not row.get("updated_at"):
+            return
+
+        # Naive UTC, like the timestamps the refresh filters on
+        updated_at = datetime.fromisoformat(str(row["updated_at"]))
+        if updated_at.tzinfo is not None:
+            updated_at = updated_at.astimezone(timezone.utc).replace(tzinfo=None)
+        if self.watermark is None or updated_at > self.watermark:
+            self.watermark = updated_at
+
+    def _insert(self, row: dict) -> None:
+        for key in self._row_keys(row):
+            bisect.insort(self._keys, key)
+
+    def _delete(self, row: dict) -> None:
+        for key in self._row_keys(row):
+            position = bisect.bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                del self._keys[position]
+
+    def _upsert(self, row: dict) -> None:
+        """Add or update a row; it may be partial, see services/changes.py."""
+        current = self._remove(row["equipment_id"])
+        row = {**(current or {}), **row}
+        row = {column: row.get(column) for column in AUTOCOMPLETE_COLUMNS}
+        self.rows[row["equipment_id"]] = row
+        self._insert(row)
+        self._advance_watermark(row)
+
+    def _remove(self, equipment_id: int) -> Optional[dict]:
+        current = self.rows.pop(equipment_id, None)
+        if current is not None:
+            self._delete(current)
+        return current
+
+    def apply_change(self, before: Optional[dict], after: Optional[dict]) -> None:
+        """Equipment change listener (see services/changes.py)."""
+        if not self.loaded:
+            return
+
+        if after is None:
+            self._remove(before["equipment_id"])
+        else:
+            self._upsert(after)
+
+        self.results.delete_prefix("")
+
+    def lookup(self, prefix: str, limit: int) -> List[dict]:
+        prefix = prefix.strip().lower()
+        cache_key = f"{limit}:{prefix}"
+        hit, cached = self.results.get(cache_key)
+        if hit:
+            return cached
+
+        matches: List[dict] = []
+        seen = set()
+        position = bisect.bisect_left(self._keys, (prefix,))
+        while position < len(self._keys) and len(matches) < limit:
+            key, equipment_id = self._keys[position]
+            if not key.startswith(prefix):
+                break
+            if equipment_id not in seen:
+                seen.add(equipment_id)
+                matches.append(self.rows[equipment_id])
+            position += 1
+
+        self.results.set(cache_key, matches, AUTOCOMPLETE_CACHE_TTL)
+        return matches
+
+
+def get_autocomplete_index() -> AutocompleteIndex:
+    """FastAPI dependency returning the asset tag / serial number index."""
+    return AutocompleteIndex.get_instance()
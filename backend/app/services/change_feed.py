@@ -0,0 +1,162 @@
+import asyncio
+import os
+from typing import AsyncIterator, Optional, Set
+import orjson
+from ..config.metrics import FEED_SUBSCRIBERS
+from .dashboard_snapshot import DIMENSIONS, DashboardSnapshot
+
+# Changes arriving within this window of the first one go out as one event
+FEED_COALESCE_SECONDS = float(os.getenv("FEED_COALESCE_SECONDS", "1"))
+# A comment line is sent after this long without an event, so proxies keep
+# the connection open and dead clients are noticed
+FEED_HEARTBEAT_SECONDS = float(os.getenv("FEED_HEARTBEAT_SECONDS", "15"))
+FEED_MAX_SUBSCRIBERS = int(os.getenv("FEED_MAX_SUBSCRIBERS", "500"))
+# A subscriber with more changed ids than this pending is sent a resync
+# instead of the ids
+FEED_MAX_PENDING_IDS = int(os.getenv("FEED_MAX_PENDING_IDS", "1000"))
+
+
+class ChangeFeedFull(Exception):
+    pass
+
+
+class FeedSubscriber:
+    """
+    Pending changes of one connected client. Changes are merged into a set
+    rather than queued, so a slow client holds at most one batch of ids no
+    matter how far behind it falls.
+    """
+
+    def __init__(self):
+        self.equipment_ids: Set[int] = set()
+        self.overflowed = False
+        self.wakeup = asyncio.Event()
+
+    def publish(self, equipment_id: int) -> None:
+        if not self.overflowed:
+            self.equipment_ids.add(equipment_id)
+            if len(self.equipment_ids) > FEED_MAX_PENDING_IDS:
+                self.overflowed = True
+                self.equipment_ids.clear()
+        self.wakeup.set()
+
+    def drain(self) -> tuple:
+        equipment_ids, overflowed = self.equipment_ids, self.overflowed
+        self.equipment_ids, self.overflowed = set(), False
+        self.wakeup.clear()
+        return sorted(equipment_ids), overflowed
+
+
+def format_event(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {orjson.dumps(data).decode()}")
+    return "\n".join(lines) + "\n\n"
+
+
+class ChangeFeed:
+    """
+    Server-sent change events for open dashboard and inventory pages, fed by
+    the equipment change notifications of the write paths.
+
+    Each event names the equipment that changed (to be fetched through
+    /equipment/changes) and carries the current dashboard counters, so
+    clients stop polling both. A ``resync`` event replaces the ids when a
+    client fell too far behind to list them.
+    """
+
+    _instance: Optional["ChangeFeed"] = None
+
+    def __init__(self):
+        self.subscribers: Set[FeedSubscriber] = set()
+        self.sequence = 0
+
+    @classmethod
+    def get_instance(cls) -> "ChangeFeed":
+        if cls._instance is None:
+            cls._instance = cls()
+
+        return cls._instance
+
+    def apply_change(self, before: Optional[dict], after: Optional[dict]) -> None:
+        """Equipment change listener publishing to every subscriber."""
+        equipment_id = (after or before or {}).get("equipment_id")
+        if equipment_id is None:
+            return
+
+        self.sequence += 1
+        for subscriber in self.subscribers:
+            subscriber.publish(equipment_id)
+
+    def check_capacity(self) -> None:
+        if len(self.subscribers) >= FEED_MAX_SUBSCRIBERS:
+            raise ChangeFeedFull(f"{len(self.subscribers)} clients are connected")
+
+    def subscribe(self) -> FeedSubscriber:
+        self.check_capacity()
+        subscriber = FeedSubscriber()
+        self.subscribers.add(subscriber)
+        FEED_SUBSCRIBERS.set(len(self.subscribers))
+        return subscriber
+
+    def unsubscribe(self, subscriber: FeedSubscriber) -> None:
+        self.subscribers.discard(subscriber)
+        FEED_SUBSCRIBERS.set(len(self.subscribers))
+
+    def dashboard(self) -> Optional[dict]:
+        snapshot = DashboardSnapshot.get_instance()
+        if snapshot.as_of is None:
+            return None
+
+        return {
+            "counts": {
+                by: [
+                    {"name": name, "value": value}
+                    for name, value in snapshot.counts[by].most_common()
+                ]
+                for by in DIMENSIONS
+            },
+            "as_of": snapshot.as_of.isoformat(),
+        }
+
+    async def stream(self) -> AsyncIterator[str]:
+        """
+        Event stream of one client. It subscribes on its first iteration and
+        unsubscribes when the client goes, so a client gone before the
+        stream started never holds a place.
+        """
+        try:
+            subscriber = self.subscribe()
+        except ChangeFeedFull:
+            # Filled up since the request was accepted: have the client retry
+            yield "retry: 30000\n\n"
+            return
+
+        try:
+            yield format_event("dashboard", {"dashboard": self.dashboard()})
+            while True:
+                try:
+                    await asyncio.wait_for(
+                        subscriber.wakeup.wait(), FEED_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                # Let a burst of writes settle into one event
+                await asyncio.sleep(FEED_COALESCE_SECONDS)
+                equipment_ids, overflowed = subscriber.drain()
+                data = {"dashboard": self.dashboard()}
+                if overflowed:
+                    yield format_event("resync", data, self.sequence)
+                else:
+                    data["equipment_ids"] = equipment_ids
+                    yield format_event("changes", data, self.sequence)
+        finally:
+            self.unsubscribe(subscriber)
+
+
+def get_change_feed() -> ChangeFeed:
+    """FastAPI dependency returning the change feed."""
+    return ChangeFeed.get_instance()
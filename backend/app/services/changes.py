@@ -0,0 +1,31 @@
+import logging
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Called with (before, after) for every equipment write made through the API.
+# ``before`` is None for new equipment and ``after`` is None for removed
+# equipment. Either may be partial but always carries equipment_id plus every
+# column the write changed.
+EquipmentListener = Callable[[Optional[dict], Optional[dict]], None]
+
+_equipment_listeners: List[EquipmentListener] = []
+
+
+def subscribe_equipment_changes(listener: EquipmentListener) -> None:
+    if listener not in _equipment_listeners:
+        _equipment_listeners.append(listener)
+
+
+def unsubscribe_equipment_changes(listener: EquipmentListener) -> None:
+    if listener in _equipment_listeners:
+        _equipment_listeners.remove(listener)
+
+
+def equipment_changed(before: Optional[dict], after: Optional[dict]) -> None:
+    for listener in list(_equipment_listeners):
+        try:
+            listener(before, after)
+        except Exception:
+            # A broken derived view must never fail the write that fed it
+            logger.exception("Equipment change listener %r failed", listener)
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from ..config.database import Database
+
+logger = logging.getLogger(__name__)
+
+# How often the counters are rebuilt from the database to correct any drift
+# left behind by writes made outside this API.
+DASHBOARD_RECONCILE_SECONDS = float(os.getenv("DASHBOARD_RECONCILE_SECONDS", "300"))
+
+DIMENSIONS = ("building", "manufacturer", "form_factor", "status")
+
+# Equipment columns the counters are derived from
+TRACKED_COLUMNS = ("location_id", "manufacturer", "form_factor", "status")
+
+
+class DashboardSnapshot:
+    """
+    In-memory equipment counters behind the dashboard charts.
+
+    Counts are rebuilt from the equipment_distribution() aggregates on
+    reconciliation and adjusted in place by the equipment and assignment
+    write paths in between.
+    """
+
+    _instance: Optional["DashboardSnapshot"] = None
+
+    def __init__(self):
+        self.counts: Dict[str, Counter] = {by: Counter() for by in DIMENSIONS}
+        self.location_buildings: Dict[int, str] = {}
+        self.as_of: Optional[datetime] = None
+        self.reconciled_at: Optional[datetime] = None
+        self._reconcile_lock = asyncio.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "DashboardSnapshot":
+        if cls._instance is None:
+            cls._instance = cls()
+
+        return cls._instance
+
+    def dimension_values(self, equipment: dict) -> Dict[str, Optional[str]]:
+        location_id = equipment.get("location_id")
+        return {
+            "building": (
+                self.location_buildings.get(location_id, "Unassigned")
+                if location_id
+                else None
+            ),
+            "manufacturer": equipment.get("manufacturer"),
+            "form_factor": equipment.get("form_factor"),
+            "status": equipment.get("status"),
+        }
+
+    def _add(self, equipment: dict, amount: int) -> None:
+        for by, value in self.dimension_values(equipment).items():
+            if value is None:
+                continue
+            self.counts[by][value] += amount
+            if self.counts[by][value] <= 0:
+                del self.counts[by][value]
+
+    def apply_change(self, before: Optional[dict], after: Optional[dict]) -> None:
+        """
+        Move one piece of equipment between buckets. ``before`` is None for a
+        new row, ``after`` is None for a removed one; either may be partial as
+        long as it carries every tracked column that changed.
+        """
+        if self.as_of is None:
+            # Not loaded yet; the first reconciliation will include this write
+            return
+
+        if before is not None:
+            self._add(before, -1)
+        if after is not None:
+            self._add(after, 1)
+        self.as_of = datetime.now(timezone.utc)
+
+    async def reconcile(self, db: Database) -> None:
+        async with self._reconcile_lock:
+            locations, *distributions = await asyncio.gather(
+                db.execute(
+                    db.from_("locations").select(
+                        "location_id, buildings(building_name)"
+                    )
+                ),
+                *(
+                    db.execute(db.rpc("equipment_distribution", {"group_by": by}))
+                    for by in DIMENSIONS
+                ),
+            )
+
+            self.location_buildings = {
+                location["location_id"]: location["buildings"]["building_name"]
+                for location in locations.data
+                if location.get("buildings")
+            }
+            self.counts = {
+                by: Counter({row["name"]: row["value"] for row in response.data})
+                for by, response in zip(DIMENSIONS, distributions)
+            }
+            self.as_of = self.reconciled_at = datetime.now(timezone.utc)
+
+    async def distribution(self, db: Database, by: str) -> dict:
+        if self.as_of is None:
+            await self.reconcile(db)
+
+        return {
+            "type": f"{by}_distribution",
+            "data": [
+                {"name": name, "value": value}
+                for name, value in self.counts[by].most_common()
+            ],
+            "as_of": self.as_of.isoformat(),
+        }
+
+    async def run_reconciliation(self, interval: float = DASHBOARD_RECONCILE_SECONDS):
+        """Background task started by the application lifespan hook."""
+        while True:
+            try:
+                await self.reconcile(Database.get_instance())
+            except Exception:
+                logger.exception("Dashboard reconciliation failed")
+            await asyncio.sleep(interval)
+
+
+def get_dashboard_snapshot() -> DashboardSnapshot:
+    """FastAPI dependency returning the dashboard counters."""
+    return DashboardSnapshot.get_instance()
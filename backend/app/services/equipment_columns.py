@@ -0,0 +1,291 @@
+import asyncio
+import logging
+import operator
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+from ..config.database import Database
+from .report_export import REPORT_COLUMNS, REPORT_INTEGER_COLUMNS, ReportCondition
+
+try:
+    import numpy as np
+except ImportError:  # Reports are answered by the database without numpy
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# How often rows changed outside this API are pulled in, via updated_at and
+# the tombstones (migrations/008_equipment_changes.sql). Rows updated within
+# the overlap before the last refresh are read again, as with
+# /equipment/changes.
+EQUIPMENT_COLUMNS_REFRESH_SECONDS = float(
+    os.getenv("EQUIPMENT_COLUMNS_REFRESH_SECONDS", "30")
+)
+REFRESH_OVERLAP_SECONDS = 30
+
+# Low-cardinality columns, stored as int32 codes into a per-column dictionary
+# of values (-1 for null)
+DICTIONARY_COLUMNS = (
+    "status",
+    "form_factor",
+    "manufacturer",
+    "operating_system",
+    "location_id",
+)
+# Stored as microsecond datetime64 (NaT for null), the precision of Postgres
+# timestamps, for range filters
+DATE_COLUMNS = ("warranty_start_date", "warranty_end_date", "created_at", "updated_at")
+# Only ever returned, never filtered on; updated_at is kept as sent too
+TEXT_COLUMNS = ("device_name", "updated_at_text")
+
+SNAPSHOT_COLUMNS = ("equipment_id", "device_name", *DICTIONARY_COLUMNS, *DATE_COLUMNS)
+
+COMPARISONS = {
+    "eq": operator.eq,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+}
+
+
+def to_datetime64(value: Any) -> "np.datetime64":
+    """Dates and ISO timestamps as naive UTC datetime64 microseconds."""
+    if value is None or value == "":
+        return np.datetime64("NaT", "us")
+
+    parsed = datetime.fromisoformat(str(value))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(parsed, "us")
+
+
+class DictionaryColumn:
+    """Distinct values of one column; rows store their index in ``values``."""
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self.codes: Dict[Any, int] = {}
+
+    def encode(self, value: Any) -> int:
+        if value is None:
+            return -1
+
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, values: Iterable[Any]) -> List[int]:
+        return [self.codes[value] for value in values if value in self.codes]
+
+    def decode(self, codes: "np.ndarray") -> list:
+        # Code -1 picks the trailing None
+        return np.array(self.values + [None], dtype=object)[codes].tolist()
+
+
+class EquipmentColumns:
+    """
+    Columnar copy of the equipment table for ad-hoc reports: one NumPy array
+    per column, low-cardinality columns dictionary-encoded, so any
+    combination of equality, multi-value and range filters is a few
+    vectorised boolean masks instead of a database query.
+
+    Loaded on first use, kept current by the equipment write paths and
+    refreshed from updated_at for changes made elsewhere.
+    """
+
+    _instance: Optional["EquipmentColumns"] = None
+
+    def __init__(self):
+        self.size = 0
+        self.arrays: Dict[str, "np.ndarray"] = {}
+        self.dictionaries = {
+            column: DictionaryColumn() for column in DICTIONARY_COLUMNS
+        }
+        self.positions: Dict[int, int] = {}
+        self.watermark: Optional["np.datetime64"] = None
+        self.as_of: Optional[datetime] = None
+        self.loaded = False
+        self._load_lock = asyncio.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "EquipmentColumns":
+        if cls._instance is None:
+            cls._instance = cls()
+
+        return cls._instance
+
+    @staticmethod
+    def available() -> bool:
+        return np is not None
+
+    # Storage
+    def _allocate(self, capacity: int) -> None:
+        empty = {
+            "equipment_id": np.zeros(capacity, np.int64),
+            "alive": np.zeros(capacity, bool),
+            **{
+                column: np.full(capacity, -1, np.int32) for column in DICTIONARY_COLUMNS
+            },
+            **{
+                column: np.full(capacity, np.datetime64("NaT", "us"))
+                for column in DATE_COLUMNS
+            },
+            **{column: np.full(capacity, None, object) for column in TEXT_COLUMNS},
+        }
+        for column, array in self.arrays.items():
+            empty[column][: self.size] = array[: self.size]
+        self.arrays = empty
+
+    def _set(self, position: int, row: dict) -> None:
+        """Write the columns present in ``row``; others keep their value."""
+        arrays = self.arrays
+        for column in DICTIONARY_COLUMNS:
+            if column in row:
+                arrays[column][position] = self.dictionaries[column].encode(row[column])
+        for column in DATE_COLUMNS:
+            if column in row:
+                arrays[column][position] = to_datetime64(row[column])
+        if "device_name" in row:
+            arrays["device_name"][position] = row["device_name"]
+        if "updated_at" in row:
+            arrays["updated_at_text"][position] = row["updated_at"]
+            updated_at = arrays["updated_at"][position]
+            if self.watermark is None or updated_at > self.watermark:
+                self.watermark = updated_at
+
+    def upsert(self, row: dict) -> None:
+        position = self.positions.get(row["equipment_id"])
+        if position is None:
+            if self.size == len(self.arrays["equipment_id"]):
+                self._allocate(max(1024, self.size * 2))
+            position = self.positions[row["equipment_id"]] = self.size
+            self.size += 1
+            self.arrays["equipment_id"][position] = row["equipment_id"]
+        self.arrays["alive"][position] = True
+        self._set(position, row)
+
+    def remove(self, equipment_id: int) -> None:
+        position = self.positions.get(equipment_id)
+        if position is not None:
+            self.arrays["alive"][position] = False
+
+    # Loading
+    async def load(self, db: Database) -> None:
+        async with self._load_lock:
+            if self.loaded:
+                return
+
+            rows = []
+            async for page in db.fetch_pages(
+                lambda: db.table("equipment").select(*SNAPSHOT_COLUMNS),
+                "equipment_id",
+            ):
+                rows.extend(page)
+
+            self.size = 0
+            self.arrays = {}
+            self.positions = {}
+            self.watermark = None
+            self._allocate(max(1024, len(rows)))
+            for row in rows:
+                self.upsert(row)
+            self.loaded = True
+            self.as_of = datetime.now(timezone.utc)
+            logger.info("Equipment columns loaded rows=%d", self.size)
+
+    async def refresh(self, db: Database) -> None:
+        """Pull in rows updated or deleted since the last load or refresh."""
+        if not self.loaded:
+            return await self.load(db)
+
+        since = "1970-01-01T00:00:00"
+        if self.watermark is not None and not np.isnat(self.watermark):
+            since = str(self.watermark - np.timedelta64(REFRESH_OVERLAP_SECONDS, "s"))
+
+        async for page in db.fetch_pages(
+            lambda: db.table("equipment")
+            .select(*SNAPSHOT_COLUMNS)
+            .gt("updated_at", since),
+            "equipment_id",
+        ):
+            for row in page:
+                self.upsert(row)
+
+        tombstones = await db.execute(
+            db.table("equipment_tombstones")
+            .select("equipment_id")
+            .gt("deleted_at", since)
+        )
+        for tombstone in tombstones.data:
+            self.remove(tombstone["equipment_id"])
+        self.as_of = datetime.now(timezone.utc)
+
+    async def run_refresh(self, interval: float = EQUIPMENT_COLUMNS_REFRESH_SECONDS):
+        """Background task started by the application lifespan hook."""
+        while True:
+            await asyncio.sleep(interval)
+            if not self.loaded:
+                continue
+            try:
+                await self.refresh(Database.get_instance())
+            except Exception:
+                logger.exception("Equipment columns refresh failed")
+
+    def apply_change(self, before: Optional[dict], after: Optional[dict]) -> None:
+        """Equipment change listener; rows may be partial, see services/changes.py."""
+        if not self.loaded:
+            return
+
+        if after is None:
+            self.remove(before["equipment_id"])
+        elif before is None or after["equipment_id"] in self.positions:
+            self.upsert(after)
+        self.as_of = datetime.now(timezone.utc)
+
+    # Queries
+    def _mask(self, column: str, operation: str, value: Any) -> "np.ndarray":
+        values = self.arrays[column][: self.size]
+        if column in DICTIONARY_COLUMNS:
+            # Only equality and membership apply to encoded columns
+            wanted = value if operation == "in" else [value]
+            if column in REPORT_INTEGER_COLUMNS:
+                # Codes are keyed by the row values, so "3" must find 3
+                wanted = [int(item) for item in wanted]
+            return np.isin(values, self.dictionaries[column].lookup(wanted))
+
+        convert = to_datetime64 if column in DATE_COLUMNS else int
+        if operation == "in":
+            return np.isin(values, [convert(item) for item in value])
+        return COMPARISONS[operation](values, convert(value))
+
+    def select(self, conditions: List[ReportCondition]) -> "np.ndarray":
+        """Positions of the live rows matching every condition, by equipment_id."""
+        mask = self.arrays["alive"][: self.size].copy()
+        for column, operation, value in conditions:
+            mask &= self._mask(column, operation, value)
+
+        positions = np.flatnonzero(mask)
+        order = np.argsort(self.arrays["equipment_id"][positions], kind="stable")
+        return positions[order]
+
+    def report(self, conditions: List[ReportCondition]) -> List[dict]:
+        positions = self.select(conditions)
+        columns = []
+        for column in REPORT_COLUMNS:
+            if column in DICTIONARY_COLUMNS:
+                columns.append(
+                    self.dictionaries[column].decode(self.arrays[column][positions])
+                )
+            elif column == "updated_at":
+                columns.append(self.arrays["updated_at_text"][positions].tolist())
+            else:
+                columns.append(self.arrays[column][positions].tolist())
+        return [dict(zip(REPORT_COLUMNS, values)) for values in zip(*columns)]
+
+
+def get_equipment_columns() -> EquipmentColumns:
+    """FastAPI dependency returning the columnar equipment snapshot."""
+    return EquipmentColumns.get_instance()
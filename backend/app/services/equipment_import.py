@@ -0,0 +1,149 @@
+import csv
+import io
+import itertools
+import json
+import os
+from typing import IO, Iterator, List, Tuple
+from postgrest.exceptions import APIError
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+from ..config.database import Database
+from ..models.schemas import EquipmentCreate
+from .changes import equipment_changed
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+
+def iter_csv_rows(file: IO[bytes]) -> Iterator[Tuple[int, dict]]:
+    """Yield (line number, row) pairs, treating empty cells as missing."""
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+    for row in reader:
+        yield reader.line_num, {
+            key.strip(): value for key, value in row.items() if key and value != ""
+        }
+
+
+def iter_ndjson_rows(file: IO[bytes]) -> Iterator[Tuple[int, dict]]:
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, {"__error__": f"Invalid JSON: {e.msg}"}
+            continue
+        if not isinstance(row, dict):
+            row = {"__error__": "Expected a JSON object"}
+        yield line_number, row
+
+
+def validate_batch(
+    rows: Iterator[Tuple[int, dict]], batch_size: int
+) -> Tuple[List[Tuple[int, dict]], List[dict], bool]:
+    """
+    Pull up to ``batch_size`` rows from the reader and validate them against
+    EquipmentCreate. Returns the valid rows, the per-row errors and whether
+    the reader is exhausted.
+    """
+    valid, errors, seen = [], [], 0
+    for line_number, row in itertools.islice(rows, batch_size):
+        seen += 1
+        if "__error__" in row:
+            errors.append({"row": line_number, "errors": [row["__error__"]]})
+            continue
+        try:
+            equipment = EquipmentCreate.model_validate(row)
+        except ValidationError as e:
+            errors.append(
+                {
+                    "row": line_number,
+                    "errors": [
+                        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+                        for error in e.errors()
+                    ],
+                }
+            )
+            continue
+        valid.append((line_number, equipment.model_dump()))
+
+    return valid, errors, seen < batch_size
+
+
+async def insert_rows(
+    db: Database, valid: List[Tuple[int, dict]]
+) -> Tuple[List[dict], List[dict]]:
+    """
+    Insert validated rows in one statement. When the database rejects the
+    statement (a duplicate asset_tag, say), halve it and retry each half, so
+    only the rows that fail on their own are reported, each with its own
+    error. Any other failure (a timeout, the database unreachable) stops the
+    insert: the rows of that statement and those not yet tried are reported
+    with it. Returns the inserted rows and the per-row errors.
+    """
+    inserted, errors = [], []
+    # Chunks still to insert, next one last, so rows go in file order
+    pending = [valid]
+    while pending:
+        chunk = pending.pop()
+        try:
+            response = await db.execute(
+                db.table("equipment").insert([record for _, record in chunk])
+            )
+        except APIError as e:
+            if len(chunk) == 1:
+                errors.append({"row": chunk[0][0], "errors": [e.message or str(e)]})
+            else:
+                middle = len(chunk) // 2
+                pending.extend([chunk[middle:], chunk[:middle]])
+            continue
+        except Exception as e:
+            for rows in [chunk, *pending]:
+                errors.extend(
+                    {"row": line_number, "errors": [str(e)]} for line_number, _ in rows
+                )
+            break
+
+        inserted.extend(response.data)
+
+    return inserted, errors
+
+
+async def import_equipment(
+    db: Database,
+    file: IO[bytes],
+    file_format: str,
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> dict:
+    """
+    Stream rows out of an uploaded file and insert them ``batch_size`` at a
+    time. Only one batch is held in memory; parsing and validation run off
+    the event loop.
+    """
+    rows = iter_csv_rows(file) if file_format == "csv" else iter_ndjson_rows(file)
+    imported, errors, total = 0, [], 0
+
+    done = False
+    while not done:
+        valid, batch_errors, done = await run_in_threadpool(
+            validate_batch, rows, batch_size
+        )
+        total += len(valid) + len(batch_errors)
+        errors.extend(batch_errors)
+        if not valid:
+            continue
+
+        inserted, insert_errors = await insert_rows(db, valid)
+        errors.extend(insert_errors)
+        imported += len(inserted)
+        for row in inserted:
+            equipment_changed(None, row)
+
+    return {
+        "status": "success" if not errors else "partial",
+        "total_rows": total,
+        "imported": imported,
+        "failed": len(errors),
+        "errors": sorted(errors, key=lambda error: error["row"]),
+    }
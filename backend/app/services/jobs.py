@@ -0,0 +1,381 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from ..config.database import Database
+from .report_export import run_report_job
+
+logger = logging.getLogger(__name__)
+
+# Long-running work (large report exports) runs on a small pool of background
+# workers instead of inside the request. Job state lives in SQLite and results
+# in files next to it, so both survive a restart and are shared by every
+# worker process using the same JOB_DATA_DIR.
+JOB_DATA_DIR = os.getenv("JOB_DATA_DIR", "data/jobs")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "100"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 86400)))
+
+# Running jobs are marked alive this often by the process running them; one
+# whose mark is older than JOB_STALE_SECONDS lost its process and is queued
+# again by whichever process notices first.
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "10"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+# Idle workers look for jobs submitted through other processes this often
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+# Expired jobs and their results are removed this often
+JOB_PURGE_SECONDS = float(os.getenv("JOB_PURGE_SECONDS", "3600"))
+
+# Progress is written to SQLite at most this often per job
+JOB_PROGRESS_INTERVAL = 0.5
+
+# A handler gets the database, the job's params and its JobContext, writes
+# its output to context.result_path and returns the download's media_type
+# and filename.
+JobHandler = Callable[[Database, dict, "JobContext"], Awaitable[dict]]
+
+JOB_HANDLERS: Dict[str, JobHandler] = {
+    "report": run_report_job,
+}
+
+SCHEMA = """
+create table if not exists jobs (
+    job_id text primary key,
+    kind text not null,
+    params text not null,
+    status text not null,
+    processed integer not null default 0,
+    total integer,
+    error text,
+    media_type text,
+    filename text,
+    created_at text not null,
+    started_at text,
+    finished_at text,
+    owner text,
+    heartbeat_at real
+)
+"""
+
+# Columns added since the first schema, for stores created before them
+ADDED_COLUMNS = {"owner": "text", "heartbeat_at": "real"}
+
+JOB_COLUMNS = (
+    "job_id",
+    "kind",
+    "status",
+    "processed",
+    "total",
+    "error",
+    "media_type",
+    "filename",
+    "created_at",
+    "started_at",
+    "finished_at",
+)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobContext:
+    """Handed to a running job handler for its result file and progress."""
+
+    def __init__(self, queue: "JobQueue", job_id: str):
+        self.queue = queue
+        self.job_id = job_id
+        # Written under a name of its own and renamed on success, so a job
+        # re-run elsewhere never writes into a result being downloaded
+        self.result_path = f"{queue.result_path(job_id)}.{queue.owner}.part"
+        self._reported_at = 0.0
+
+    async def update(self, processed: int, total: Optional[int] = None) -> None:
+        now = time.monotonic()
+        if now - self._reported_at < JOB_PROGRESS_INTERVAL and processed != total:
+            return
+
+        self._reported_at = now
+        await self.queue._set(self.job_id, processed=processed, total=total)
+
+
+class JobQueue:
+    """
+    Background job queue: submit() records a job and returns at once, a
+    bounded set of worker tasks per process runs jobs in submission order,
+    and callers poll get() for progress and fetch the result file when it
+    succeeds.
+
+    Workers claim a job by moving it from queued to running in one
+    conditional update, so with several processes sharing the store each
+    job runs once. Jobs whose process stopped while running them are queued
+    again once their heartbeat goes stale, so handlers must be safe to
+    re-run. SQLite is only used from worker threads, never on the event loop.
+    """
+
+    _instance: Optional["JobQueue"] = None
+
+    def __init__(
+        self,
+        data_dir: str = JOB_DATA_DIR,
+        workers: int = JOB_WORKERS,
+        handlers: Optional[Dict[str, JobHandler]] = None,
+    ):
+        self.data_dir = data_dir
+        self.handlers = handlers or JOB_HANDLERS
+        # Identifies this process's claims in the shared store
+        self.owner = uuid.uuid4().hex
+        os.makedirs(os.path.join(data_dir, "results"), exist_ok=True)
+
+        self._connection = sqlite3.connect(
+            os.path.join(data_dir, "jobs.sqlite3"), check_same_thread=False
+        )
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("pragma journal_mode=wal")
+        self._connection.execute(SCHEMA)
+        columns = {
+            row["name"] for row in self._connection.execute("pragma table_info(jobs)")
+        }
+        for column, column_type in ADDED_COLUMNS.items():
+            if column not in columns:
+                self._connection.execute(
+                    f"alter table jobs add column {column} {column_type}"
+                )
+        self._connection.commit()
+        self._lock = threading.Lock()
+
+        self._wakeup = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._work(), name=f"job-worker-{number}")
+            for number in range(workers)
+        ]
+        self._housekeeping = asyncio.create_task(
+            self._keep_house(), name="job-housekeeping"
+        )
+
+    @classmethod
+    def connect(cls) -> "JobQueue":
+        """Open the job store and start the workers; needs a running event loop."""
+        if cls._instance is None:
+            cls._instance = cls()
+
+        return cls._instance
+
+    @classmethod
+    def disconnect(cls) -> None:
+        if cls._instance is not None:
+            cls._instance.close()
+            cls._instance = None
+
+    @classmethod
+    def get_instance(cls) -> "JobQueue":
+        if cls._instance is None:
+            raise RuntimeError("Job queue is not connected")
+
+        return cls._instance
+
+    def result_path(self, job_id: str) -> str:
+        return os.path.join(self.data_dir, "results", job_id)
+
+    # Blocking store access, run through asyncio.to_thread
+    def _write(self, sql: str, params: tuple = ()) -> int:
+        with self._lock:
+            changed = self._connection.execute(sql, params).rowcount
+            self._connection.commit()
+        return changed
+
+    def _read(self, sql: str, params: tuple = ()) -> List[dict]:
+        with self._lock:
+            rows = self._connection.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def _claim_next(self) -> Optional[dict]:
+        """The oldest queued job, now running under this process, if any."""
+        while True:
+            queued = self._read(
+                "select job_id, kind, params from jobs where status = 'queued'"
+                " order by created_at limit 1"
+            )
+            if not queued:
+                return None
+
+            claimed = self._write(
+                "update jobs set status = 'running', owner = ?, heartbeat_at = ?,"
+                " processed = 0, started_at = ? where job_id = ? and status = 'queued'",
+                (self.owner, time.time(), _now(), queued[0]["job_id"]),
+            )
+            if claimed:
+                return queued[0]
+            # Another worker or process got there first
+
+    def _purge_expired(self) -> None:
+        cutoff = datetime.fromtimestamp(
+            time.time() - JOB_RETENTION_SECONDS, timezone.utc
+        ).isoformat()
+        for job in self._read(
+            "select job_id from jobs"
+            " where status in ('succeeded', 'failed') and finished_at < ?",
+            (cutoff,),
+        ):
+            if os.path.exists(self.result_path(job["job_id"])):
+                os.remove(self.result_path(job["job_id"]))
+            self._write("delete from jobs where job_id = ?", (job["job_id"],))
+
+        # Partial results left by processes that stopped mid-job
+        results = os.path.join(self.data_dir, "results")
+        abandoned_before = time.time() - JOB_RETENTION_SECONDS
+        for name in os.listdir(results):
+            path = os.path.join(results, name)
+            if name.endswith(".part") and os.path.getmtime(path) < abandoned_before:
+                os.remove(path)
+
+    async def _set(self, job_id: str, **values: Any) -> bool:
+        """Update a job this process is running; False once it lost the claim."""
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        changed = await asyncio.to_thread(
+            self._write,
+            f"update jobs set {assignments}, heartbeat_at = ?"
+            " where job_id = ? and owner = ? and status = 'running'",
+            (*values.values(), time.time(), job_id, self.owner),
+        )
+        return changed > 0
+
+    async def _select(self, where: str = "", params: tuple = ()) -> List[dict]:
+        return await asyncio.to_thread(
+            self._read, f"select {', '.join(JOB_COLUMNS)} from jobs {where}", params
+        )
+
+    async def submit(self, kind: str, params: dict) -> dict:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        queued = await asyncio.to_thread(
+            self._read, "select count(*) as queued from jobs where status = 'queued'"
+        )
+        if queued[0]["queued"] >= JOB_MAX_QUEUED:
+            raise JobQueueFull(f"{queued[0]['queued']} jobs are already queued")
+
+        job_id = uuid.uuid4().hex
+        await asyncio.to_thread(
+            self._write,
+            "insert into jobs (job_id, kind, params, status, created_at)"
+            " values (?, ?, ?, 'queued', ?)",
+            (job_id, kind, json.dumps(params), _now()),
+        )
+
+        self._wakeup.set()
+        return await self.get(job_id)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        jobs = await self._select("where job_id = ?", (job_id,))
+        return jobs[0] if jobs else None
+
+    async def recent(self, limit: int = 50) -> List[dict]:
+        return await self._select("order by created_at desc limit ?", (limit,))
+
+    async def _keep_house(self) -> None:
+        """Heartbeats this process's jobs, requeues orphans and purges."""
+        purged_at = 0.0
+        while True:
+            try:
+                await asyncio.to_thread(
+                    self._write,
+                    "update jobs set heartbeat_at = ?"
+                    " where owner = ? and status = 'running'",
+                    (time.time(), self.owner),
+                )
+                requeued = await asyncio.to_thread(
+                    self._write,
+                    "update jobs set status = 'queued', owner = null,"
+                    " heartbeat_at = null, processed = 0, started_at = null"
+                    " where status = 'running'"
+                    " and (heartbeat_at is null or heartbeat_at < ?)",
+                    (time.time() - JOB_STALE_SECONDS,),
+                )
+                if requeued:
+                    logger.warning("Requeued %d orphaned jobs", requeued)
+                    self._wakeup.set()
+                if time.monotonic() - purged_at >= JOB_PURGE_SECONDS:
+                    await asyncio.to_thread(self._purge_expired)
+                    purged_at = time.monotonic()
+            except Exception:
+                logger.exception("Job housekeeping failed")
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+
+    async def _work(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await asyncio.to_thread(self._claim_next)
+            except Exception:
+                logger.exception("Claiming a job failed")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(job)
+
+    async def _run(self, job: dict) -> None:
+        job_id = job["job_id"]
+        context = JobContext(self, job_id)
+        try:
+            result = await self.handlers[job["kind"]](
+                Database.get_instance(), json.loads(job["params"]), context
+            )
+        except asyncio.CancelledError:
+            # Shutting down: the job stays "running" until its heartbeat goes
+            # stale, then runs again
+            raise
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job_id, job["kind"])
+            await self._set(job_id, status="failed", error=str(e), finished_at=_now())
+            if os.path.exists(context.result_path):
+                os.remove(context.result_path)
+            return
+
+        os.replace(context.result_path, self.result_path(job_id))
+        finished = await self._set(
+            job_id,
+            status="succeeded",
+            media_type=result["media_type"],
+            filename=result["filename"],
+            finished_at=_now(),
+        )
+        if not finished:
+            logger.warning("Job %s finished after it was requeued", job_id)
+
+    async def stats(self) -> dict:
+        rows = await asyncio.to_thread(
+            self._read, "select status, count(*) as jobs from jobs group by status"
+        )
+        return {
+            "workers": len(self._workers),
+            "jobs": {row["status"]: row["jobs"] for row in rows},
+        }
+
+    def close(self) -> None:
+        self._housekeeping.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        with self._lock:
+            self._connection.close()
+
+
+def get_job_queue() -> JobQueue:
+    """FastAPI dependency returning the background job queue."""
+    return JobQueue.get_instance()
@@ -0,0 +1,84 @@
+import asyncio
+import os
+from typing import Any, Dict, Iterable, List, Optional
+from fastapi import Depends
+from ..config.database import Database, get_db
+
+# Keys per in_() query; they travel in the URL, so batches stay well below
+# PostgREST's request line limit
+LOADER_BATCH_SIZE = int(os.getenv("LOADER_BATCH_SIZE", "200"))
+
+
+class RowLoader:
+    """
+    Rows of one table looked up by key for the length of a request.
+
+    Keys asked for in the same event loop tick, by any number of concurrent
+    callers, are fetched together with one ``in_()`` query per batch, and
+    each key is fetched at most once. Missing keys load as None.
+    """
+
+    def __init__(self, db: Database, table: str, key: str, columns: str = "*"):
+        self.db = db
+        self.table = table
+        self.key = key
+        self.columns = columns
+        self._rows: Dict[Any, asyncio.Future] = {}
+        self._pending: List[Any] = []
+
+    def load(self, key: Any) -> asyncio.Future:
+        future = self._rows.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._rows[key] = loop.create_future()
+            self._pending.append(key)
+            if len(self._pending) == 1:
+                # Dispatch once the other callers of this tick have queued theirs
+                loop.call_soon(self._dispatch)
+        return future
+
+    async def load_many(self, keys: Iterable[Any]) -> Dict[Any, Optional[dict]]:
+        keys = [key for key in dict.fromkeys(keys) if key is not None]
+        rows = await asyncio.gather(*(self.load(key) for key in keys))
+        return dict(zip(keys, rows))
+
+    def _dispatch(self) -> None:
+        keys, self._pending = self._pending, []
+        for start in range(0, len(keys), LOADER_BATCH_SIZE):
+            asyncio.ensure_future(self._fetch(keys[start : start + LOADER_BATCH_SIZE]))
+
+    async def _fetch(self, keys: List[Any]) -> None:
+        try:
+            response = await self.db.execute(
+                self.db.table(self.table).select(self.columns).in_(self.key, keys)
+            )
+        except Exception as e:
+            for key in keys:
+                # Forget the failure so a later load() can try again
+                self._rows.pop(key).set_exception(e)
+            return
+
+        found = {row[self.key]: row for row in response.data}
+        for key in keys:
+            self._rows[key].set_result(found.get(key))
+
+
+class DataLoaders:
+    """The RowLoaders of one request, one per (table, key, columns)."""
+
+    def __init__(self, db: Database):
+        self.db = db
+        self._loaders: Dict[tuple, RowLoader] = {}
+
+    def table(self, table: str, key: str, columns: str = "*") -> RowLoader:
+        loader = self._loaders.get((table, key, columns))
+        if loader is None:
+            loader = self._loaders[(table, key, columns)] = RowLoader(
+                self.db, table, key, columns
+            )
+        return loader
+
+
+def get_loaders(db: Database = Depends(get_db)) -> DataLoaders:
+    """FastAPI dependency returning a fresh set of loaders for each request."""
+    return DataLoaders(db)
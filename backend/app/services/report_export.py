@@ -0,0 +1,304 @@
+import asyncio
+import csv
+import io
+import json
+import logging
+import zipfile
+from datetime import date, datetime
+from typing import Any, AsyncIterator, List, Sequence, Tuple
+from xml.sax.saxutils import escape
+from ..config.database import Database
+
+logger = logging.getLogger(__name__)
+
+REPORT_COLUMNS = ("equipment_id", "device_name", "status", "form_factor", "updated_at")
+
+# Report filters, by column. A plain value must match exactly, a list matches
+# any of its values, and an object of range bounds, e.g.
+# {"warranty_end_date": {"gte": "2025-01-01", "lt": "2026-01-01"}}, is
+# accepted by the range columns. Empty values are ignored, and so are
+# filters on other columns, which older clients send.
+REPORT_FILTER_COLUMNS = (
+    "status",
+    "form_factor",
+    "manufacturer",
+    "operating_system",
+    "location_id",
+    "equipment_id",
+    "warranty_start_date",
+    "warranty_end_date",
+    "created_at",
+    "updated_at",
+)
+REPORT_RANGE_COLUMNS = (
+    "equipment_id",
+    "warranty_start_date",
+    "warranty_end_date",
+    "created_at",
+    "updated_at",
+)
+RANGE_OPERATORS = ("gt", "gte", "lt", "lte")
+# Filter values are coerced to the column type, so every report path
+# compares the same values; the rest are text
+REPORT_INTEGER_COLUMNS = ("equipment_id", "location_id")
+REPORT_DATE_COLUMNS = (
+    "warranty_start_date",
+    "warranty_end_date",
+    "created_at",
+    "updated_at",
+)
+# "type" is what the reports page has always called form_factor
+REPORT_FILTER_ALIASES = {"type": "form_factor"}
+# The date range of older reports pages, on the updated_at shown in the report
+REPORT_RANGE_ALIASES = {
+    "start_date": ("updated_at", "gte"),
+    "end_date": ("updated_at", "lte"),
+}
+
+ReportCondition = Tuple[str, str, Any]
+
+
+def coerce_filter_value(name: str, column: str, value: Any) -> Any:
+    """
+    A filter value as the column's type: ints for ids, ISO timestamps for
+    dates and strings otherwise. Raises ValueError on anything else.
+    """
+    if isinstance(value, (bool, dict, list)) or value is None:
+        raise ValueError(f"Invalid value for filter {name}: {value!r}")
+
+    try:
+        if column in REPORT_INTEGER_COLUMNS:
+            return int(str(value))
+        if column in REPORT_DATE_COLUMNS:
+            if not isinstance(value, str):
+                raise ValueError(value)
+            try:
+                return date.fromisoformat(value).isoformat()
+            except ValueError:
+                return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid value for filter {name}: {value!r}") from None
+    return str(value)
+
+
+def parse_report_filters(filters: dict) -> List[ReportCondition]:
+    """(column, operator, value) conditions; raises ValueError on bad filters."""
+    conditions = []
+    for name, value in filters.items():
+        if value is None or value == "" or value == [] or value == {}:
+            continue
+
+        if name in REPORT_RANGE_ALIASES:
+            column, operator = REPORT_RANGE_ALIASES[name]
+            value = coerce_filter_value(name, column, value)
+            conditions.append((column, operator, value))
+            continue
+
+        column = REPORT_FILTER_ALIASES.get(name, name)
+        if column not in REPORT_FILTER_COLUMNS:
+            logger.info("Ignoring unsupported report filter %s", name)
+            continue
+
+        if isinstance(value, list):
+            values = [coerce_filter_value(name, column, item) for item in value]
+            conditions.append((column, "in", values))
+        elif isinstance(value, dict):
+            if column not in REPORT_RANGE_COLUMNS:
+                raise ValueError(f"Filter {name} does not take a range")
+            for operator, bound in value.items():
+                if operator not in RANGE_OPERATORS:
+                    raise ValueError(f"Unknown range operator: {operator}")
+                bound = coerce_filter_value(name, column, bound)
+                conditions.append((column, operator, bound))
+        else:
+            conditions.append((column, "eq", coerce_filter_value(name, column, value)))
+    return conditions
+
+
+def apply_report_filters(query, filters: dict):
+    for column, operator, value in parse_report_filters(filters):
+        if operator == "in":
+            query = query.in_(column, value)
+        else:
+            query = getattr(query, operator)(column, value)
+    return query
+
+
+def build_report_query(db: Database, filters: dict):
+    return apply_report_filters(db.table("equipment").select(*REPORT_COLUMNS), filters)
+
+
+# Media type and file extension of each streaming export format
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "xlsx": (
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "xlsx",
+    ),
+}
+
+
+async def stream_csv(
+    columns: Sequence[str], pages: AsyncIterator[List[dict]]
+) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    yield buffer.getvalue().encode()
+
+    async for rows in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+
+
+async def stream_ndjson(
+    columns: Sequence[str], pages: AsyncIterator[List[dict]]
+) -> AsyncIterator[bytes]:
+    async for rows in pages:
+        yield "".join(
+            json.dumps({column: row.get(column) for column in columns}, default=str)
+            + "\n"
+            for row in rows
+        ).encode()
+
+
+class _ChunkWriter(io.RawIOBase):
+    """Unseekable sink that hands compressed zip bytes back out as they arrive."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        "</Types>"
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        "</Relationships>"
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Report" sheetId="1" r:id="rId1"/></sheets>'
+        "</workbook>"
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        "</Relationships>"
+    ),
+}
+
+
+def _xlsx_row(values) -> str:
+    cells = []
+    for value in values:
+        if value is None:
+            cells.append("<c/>")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f"<c><v>{value}</v></c>")
+        else:
+            cells.append(f'<c t="inlineStr"><is><t>{escape(str(value))}</t></is></c>')
+    return f"<row>{''.join(cells)}</row>"
+
+
+async def stream_xlsx(
+    columns: Sequence[str], pages: AsyncIterator[List[dict]]
+) -> AsyncIterator[bytes]:
+    """
+    Write a single-sheet workbook with inline strings. The zip container is
+    written to an unseekable sink, so each page of rows is compressed and
+    sent on without the workbook ever being assembled in memory.
+    """
+    sink = _ChunkWriter()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as workbook:
+        for name, content in XLSX_PARTS.items():
+            workbook.writestr(name, content)
+
+        with workbook.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b"<sheetData>" + _xlsx_row(columns).encode()
+            )
+            yield sink.drain()
+
+            async for rows in pages:
+                sheet.write(
+                    "".join(
+                        _xlsx_row(row.get(column) for column in columns) for row in rows
+                    ).encode()
+                )
+                yield sink.drain()
+
+            sheet.write(b"</sheetData></worksheet>")
+
+    yield sink.drain()
+
+
+EXPORT_WRITERS = {
+    "csv": stream_csv,
+    "ndjson": stream_ndjson,
+    "xlsx": stream_xlsx,
+}
+
+
+async def run_report_job(db: Database, params: dict, job: Any) -> dict:
+    """
+    Background job handler (see services/jobs.py) writing a report export to
+    the job's result file, reporting progress a page at a time.
+    """
+    filters = params.get("filters") or {}
+    export_format = params["format"]
+    media_type, extension = EXPORT_FORMATS[export_format]
+
+    counted = await db.execute(
+        apply_report_filters(
+            db.table("equipment").select("equipment_id", count="exact").limit(1),
+            filters,
+        )
+    )
+    await job.update(0, counted.count)
+
+    async def pages_with_progress():
+        processed = 0
+        async for rows in db.fetch_pages(
+            lambda: build_report_query(db, filters), "equipment_id"
+        ):
+            processed += len(rows)
+            await job.update(processed, counted.count)
+            yield rows
+
+    with open(job.result_path, "wb") as result:
+        async for chunk in EXPORT_WRITERS[export_format](
+            REPORT_COLUMNS, pages_with_progress()
+        ):
+            await asyncio.to_thread(result.write, chunk)
+
+    return {"media_type": media_type, "filename": f"equipment-report.{extension}"}
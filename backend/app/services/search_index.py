@@ -0,0 +1,95 @@
+import bisect
+import re
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class LocalSearchIndex:
+    """
+    In-process equivalent of the search_equipment() / search_device_users()
+    database functions, for running without Postgres.
+
+    Every query term must match the start of a token in one of ``fields``
+    (like the 'term':* prefix tsquery); rows are ranked by how many terms
+    matched a whole token, then by key.
+    """
+
+    def __init__(self, key: str, fields: Sequence[str]):
+        self.key = key
+        self.fields = fields
+        self.rows: Dict[int, dict] = {}
+        self._tokens: List[Tuple[str, int]] = []
+
+    def _row_tokens(self, row: dict) -> set:
+        return {
+            token
+            for field in self.fields
+            for token in tokenize(str(row.get(field) or ""))
+        }
+
+    def add(self, row: dict) -> None:
+        row_id = row[self.key]
+        if row_id in self.rows:
+            self.remove(row_id)
+
+        self.rows[row_id] = row
+        for token in self._row_tokens(row):
+            bisect.insort(self._tokens, (token, row_id))
+
+    def remove(self, row_id: int) -> None:
+        row = self.rows.pop(row_id, None)
+        if row is None:
+            return
+
+        for token in self._row_tokens(row):
+            position = bisect.bisect_left(self._tokens, (token, row_id))
+            if position < len(self._tokens) and self._tokens[position] == (
+                token,
+                row_id,
+            ):
+                del self._tokens[position]
+
+    def rebuild(self, rows: Iterable[dict]) -> None:
+        self.rows = {row[self.key]: row for row in rows}
+        self._tokens = sorted(
+            (token, row_id)
+            for row_id, row in self.rows.items()
+            for token in self._row_tokens(row)
+        )
+
+    def _prefix_matches(self, term: str) -> Dict[int, float]:
+        """Row ids with a token starting with ``term``; 1.0 for a whole-token match."""
+        matches: Dict[int, float] = {}
+        position = bisect.bisect_left(self._tokens, (term,))
+        while position < len(self._tokens):
+            token, row_id = self._tokens[position]
+            if not token.startswith(term):
+                break
+            score = 1.0 if token == term else 0.5
+            matches[row_id] = max(matches.get(row_id, 0.0), score)
+            position += 1
+        return matches
+
+    def search(self, query: str, limit: int = 50) -> List[dict]:
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        scores = self._prefix_matches(terms[0])
+        for term in terms[1:]:
+            term_matches = self._prefix_matches(term)
+            scores = {
+                row_id: score + term_matches[row_id]
+                for row_id, score in scores.items()
+                if row_id in term_matches
+            }
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [
+            {**self.rows[row_id], "rank": score} for row_id, score in ranked[:limit]
+        ]
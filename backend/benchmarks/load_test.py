@@ -0,0 +1,64 @@
+"""
+Concurrent load benchmark for a running API instance.
+
+Fires ``--requests`` GETs at ``--path`` with ``--concurrency`` in flight and
+reports latency percentiles plus an overlap factor (sum of request latencies
+divided by wall time). An overlap close to 1 means the server handled the
+requests one at a time; close to the concurrency level means they overlapped.
+
+    uvicorn app.main:app --port 8000
+    python benchmarks/load_test.py --path /equipment --concurrency 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def run(base_url: str, path: str, total: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+
+        async def one_request():
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    errors += 1
+
+        wall_started = time.perf_counter()
+        await asyncio.gather(*(one_request() for _ in range(total)))
+        wall = time.perf_counter() - wall_started
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+
+    print(f"{path}: {total} requests, concurrency {concurrency}, {errors} errors")
+    print(f"  wall time   {wall:.3f}s ({total / wall:.1f} req/s)")
+    print(f"  latency     p50 {p50 * 1000:.1f}ms  p99 {p99 * 1000:.1f}ms")
+    print(f"  mean        {statistics.mean(latencies) * 1000:.1f}ms")
+    print(f"  overlap     {sum(latencies) / wall:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/equipment")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.base_url, args.path, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
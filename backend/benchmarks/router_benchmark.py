@@ -0,0 +1,326 @@
+"""
+Reproducible per-router benchmark suite against synthetic inventories.
+
+For each ``--sizes`` entry a deterministic inventory (benchmarks/synthetic.py)
+is loaded into the in-memory database backend and the app is driven
+in-process, so results do not depend on network or Postgres state. Every
+scenario reports throughput, p50/p99 latency, CPU time per request (which is
+mostly serialisation once the data is in memory) and response bytes as sent
+on the wire, i.e. after compression.
+
+With ``--baseline`` the results are compared against a previous run saved by
+``--save-baseline``; the script exits non-zero when any scenario's p99 or
+wire bytes grow, or its throughput drops, by more than ``--tolerance``.
+
+    python benchmarks/router_benchmark.py --save-baseline benchmarks/baseline.json
+    python benchmarks/router_benchmark.py --baseline benchmarks/baseline.json
+    python benchmarks/router_benchmark.py --sizes 10000,100000,1000000
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import Database  # noqa: E402
+from app.config.memory_database import MemoryClient  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.autocomplete import AutocompleteIndex  # noqa: E402
+from app.services.dashboard_snapshot import DashboardSnapshot  # noqa: E402
+from app.services.equipment_columns import EquipmentColumns  # noqa: E402
+from synthetic import generate_inventory  # noqa: E402
+
+# (method, path, json body) for the n-th request of a scenario
+RequestFactory = Callable[[int], Tuple[str, str, Optional[dict]]]
+
+
+def build_scenarios(tables: Dict[str, List[dict]]) -> Dict[str, RequestFactory]:
+    """Scenarios by "router:name"; ids are drawn from the generated data."""
+    size = len(tables["equipment"])
+    users = len(tables["device_users"])
+    available = itertools.cycle(
+        [
+            row["equipment_id"]
+            for row in tables["equipment"]
+            if row["status"] == "Available"
+        ]
+    )
+    assignment_ids = iter(
+        row["assignment_id"] for row in tables["equipment_assignments"]
+    )
+    new_tags = itertools.count(size + 1)
+    # Prefixes of real asset tags, from broad ("NWCS-0") to narrow ("NWCS-0001")
+    tags = [row["asset_tag"] for row in tables["equipment"]]
+    tag_prefixes = [tags[(n * 7919) % size][: 6 + n % 4] for n in range(min(size, 100))]
+
+    def create_assignment(n):
+        body = {
+            "equipment_id": next(available),
+            "device_user_id": n % users + 1,
+            "assignment_start_date": "2025-01-01",
+        }
+        return "POST", "/assignments", body
+
+    def create_equipment(n):
+        tag = next(new_tags)
+        body = {
+            "asset_tag": f"BENCH-{tag:07d}",
+            "device_name": f"Bench {tag}",
+            "status": "Available",
+        }
+        return "POST", "/equipment", body
+
+    return {
+        "equipment:list": lambda n: ("GET", "/equipment?limit=100", None),
+        "equipment:list_cursor": lambda n: (
+            "GET",
+            f"/equipment?limit=100&cursor={(n * 7919) % size}",
+            None,
+        ),
+        "equipment:detail": lambda n: (
+            "GET",
+            f"/equipment/{(n * 7919) % size + 1}",
+            None,
+        ),
+        "equipment:history": lambda n: (
+            "GET",
+            f"/equipment/{(n * 7919) % size + 1}/history?limit=20",
+            None,
+        ),
+        # A client about 100 changes behind
+        "equipment:changes": lambda n: (
+            "GET",
+            "/equipment/changes?since="
+            + quote(f"{tables['equipment'][max(size - 101, 0)]['updated_at']}|0"),
+            None,
+        ),
+        "equipment:create": create_equipment,
+        "equipment:update": lambda n: (
+            "PUT",
+            f"/equipment/{(n * 7919) % size + 1}",
+            {"notes": f"benchmark {n}"},
+        ),
+        "assignments:list_by_user": lambda n: (
+            "GET",
+            f"/assignments?device_user_id={n % users + 1}",
+            None,
+        ),
+        "assignments:create": create_assignment,
+        "assignments:end": lambda n: (
+            "DELETE",
+            f"/assignments/{next(assignment_ids)}",
+            None,
+        ),
+        "locations:list": lambda n: ("GET", "/locations", None),
+        "buildings:list": lambda n: ("GET", "/buildings", None),
+        "buildings:detail": lambda n: ("GET", f"/buildings/{n % 20 + 1}", None),
+        "device_users:search": lambda n: ("GET", "/device-users?search=jordan", None),
+        "device_users:detail": lambda n: (
+            "GET",
+            f"/device-users/{n % users + 1}",
+            None,
+        ),
+        "dashboard:distribution": lambda n: (
+            "GET",
+            "/dashboard/distribution?by=manufacturer",
+            None,
+        ),
+        "reporting:json": lambda n: (
+            "POST",
+            "/api/reports/generate",
+            {"filters": {"type": "Tablet", "status": "Under Repair"}},
+        ),
+        "reporting:ad_hoc": lambda n: (
+            "POST",
+            "/api/reports/generate",
+            {
+                "filters": {
+                    "type": ["Laptop", "Tablet"],
+                    "status": ["Available", "Under Repair"],
+                    "warranty_end_date": {"gte": "2025-01-01", "lt": "2027-01-01"},
+                }
+            },
+        ),
+        "reporting:csv": lambda n: (
+            "POST",
+            "/api/reports/generate",
+            {"filters": {"type": "Tablet", "status": "Under Repair"}, "format": "csv"},
+        ),
+        "inventory:browse": lambda n: ("POST", "/api/inventory/search", {"query": ""}),
+        "inventory:search": lambda n: (
+            "POST",
+            "/api/inventory/search",
+            {"query": "laptop"},
+        ),
+        "inventory:autocomplete": lambda n: (
+            "GET",
+            f"/api/inventory/autocomplete?q={tag_prefixes[n % len(tag_prefixes)]}",
+            None,
+        ),
+        "users:search": lambda n: ("GET", "/api/users/search?query=taylor", None),
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    make_request: RequestFactory,
+    total: int,
+    concurrency: int,
+) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+    wire_bytes = 0
+
+    async def one_request(n):
+        nonlocal errors, wire_bytes
+        method, path, body = make_request(n)
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies.append(time.perf_counter() - started)
+            wire_bytes += response.num_bytes_downloaded
+            if response.status_code >= 400:
+                errors += 1
+
+    wall_started = time.perf_counter()
+    cpu_started = time.process_time()
+    await asyncio.gather(*(one_request(n) for n in range(total)))
+    cpu = time.process_time() - cpu_started
+    wall = time.perf_counter() - wall_started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "throughput": round(total / wall, 2),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p99_ms": round(
+            latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3
+        ),
+        "cpu_ms": round(cpu / total * 1000, 3),
+        "bytes": wire_bytes // total,
+    }
+
+
+async def run_size(
+    size: int, total: int, concurrency: int, repeat: int, only: Optional[str]
+) -> Dict[str, dict]:
+    started = time.perf_counter()
+    tables = generate_inventory(size)
+    print(f"size {size}: generated in {time.perf_counter() - started:.1f}s")
+
+    # Fresh process-wide state for every inventory size
+    DashboardSnapshot._instance = None
+    AutocompleteIndex._instance = None
+    EquipmentColumns._instance = None
+    Database.connect(MemoryClient(tables))
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark", timeout=300
+        ) as client:
+            for name, make_request in build_scenarios(tables).items():
+                if only and not name.startswith(only):
+                    continue
+
+                # One untimed request warms caches and lazily built indexes
+                method, path, body = make_request(total)
+                await client.request(method, path, json=body)
+
+                # Keep the best of several runs to damp scheduler noise
+                runs = [
+                    await run_scenario(client, make_request, total, concurrency)
+                    for _ in range(repeat)
+                ]
+                result = max(runs, key=lambda run: run["throughput"])
+                results[name] = result
+                print(
+                    f"  {name:28} {result['throughput']:9.1f} req/s"
+                    f"  p50 {result['p50_ms']:8.2f}ms  p99 {result['p99_ms']:8.2f}ms"
+                    f"  cpu {result['cpu_ms']:7.2f}ms  {result['bytes']:9d}B"
+                    f"  errors {result['errors']}"
+                )
+    return results
+
+
+def find_regressions(
+    results: Dict[str, Dict[str, dict]],
+    baseline: Dict[str, Dict[str, dict]],
+    tolerance: float,
+) -> List[str]:
+    regressions = []
+    for size, scenarios in results.items():
+        for name, result in scenarios.items():
+            previous = baseline.get(size, {}).get(name)
+            if previous is None:
+                continue
+            if result["errors"] > previous["errors"]:
+                regressions.append(
+                    f"{size} {name}: errors {previous['errors']} -> {result['errors']}"
+                )
+            if result["p99_ms"] > previous["p99_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{size} {name}: p99 {previous['p99_ms']}ms -> {result['p99_ms']}ms"
+                )
+            if result["bytes"] > previous.get("bytes", result["bytes"]) * (
+                1 + tolerance
+            ):
+                regressions.append(
+                    f"{size} {name}: bytes {previous['bytes']} -> {result['bytes']}"
+                )
+            if result["throughput"] < previous["throughput"] * (1 - tolerance):
+                regressions.append(
+                    f"{size} {name}: throughput {previous['throughput']}"
+                    f" -> {result['throughput']} req/s"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="10000", help="comma separated row counts")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs")
+    parser.add_argument("--only", help='run scenarios starting with e.g. "equipment"')
+    parser.add_argument("--baseline", help="fail on regressions against this file")
+    parser.add_argument("--save-baseline", help="write results to this file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = {}
+    for size in (int(size) for size in args.sizes.split(",")):
+        results[str(size)] = asyncio.run(
+            run_size(size, args.requests, args.concurrency, args.repeat, args.only)
+        )
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
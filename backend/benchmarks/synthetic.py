@@ -0,0 +1,162 @@
+"""
+Deterministic synthetic inventories for benchmarking.
+
+``generate_inventory(size)`` returns table name -> rows for an inventory of
+``size`` equipment rows, with buildings, locations, departments, device users,
+assignments and history scaled to match. The same size and seed always
+produce the same rows, so benchmark runs are comparable.
+"""
+
+import random
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List
+
+MANUFACTURERS = ("Dell", "HP", "Lenovo", "Apple", "Microsoft", "Acer", "ASUS")
+FORM_FACTORS = ("Laptop", "Desktop", "Tablet", "All-in-One", "Monitor", "Printer")
+STATUSES = ("Available", "In Use", "In Storage", "Under Repair", "Disposed")
+OPERATING_SYSTEMS = ("Windows 11", "Windows 10", "macOS 14", "Ubuntu 22.04", None)
+EMPLOYMENT_TYPES = ("Faculty", "Staff", "Student Worker", "Contractor")
+FIRST_NAMES = ("Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie")
+LAST_NAMES = ("Smith", "Johnson", "Lee", "Garcia", "Brown", "Davis", "Miller", "Wilson")
+
+
+def generate_inventory(size: int, seed: int = 42) -> Dict[str, List[dict]]:
+    rng = random.Random(seed)
+    epoch = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    buildings = [
+        {
+            "building_id": i,
+            "building_name": f"Building {i}",
+            "building_short_name": f"B{i}",
+        }
+        for i in range(1, 21)
+    ]
+    locations = [
+        {
+            "location_id": i,
+            "building_id": rng.randint(1, len(buildings)),
+            "floor_number": rng.randint(1, 6),
+            "room_number": str(rng.randint(100, 699)),
+            "description": None,
+        }
+        for i in range(1, max(50, size // 100) + 1)
+    ]
+    departments = [
+        {
+            "department_id": i,
+            "department_name": f"Department {i}",
+            "department_short_name": f"D{i}",
+        }
+        for i in range(1, 26)
+    ]
+    employment_types = [
+        {"employment_type_id": i, "employment_type_name": name}
+        for i, name in enumerate(EMPLOYMENT_TYPES, start=1)
+    ]
+    device_users = []
+    for i in range(1, max(100, size // 4) + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        device_users.append(
+            {
+                "device_user_id": i,
+                "first_name": first,
+                "last_name": last,
+                "department_id": rng.randint(1, len(departments)),
+                "employment_type_id": rng.randint(1, len(employment_types)),
+                "email": f"{first}.{last}{i}@example.edu".lower(),
+                "phone": None,
+            }
+        )
+
+    equipment, assignments, history = [], [], []
+    for i in range(1, size + 1):
+        created_at = epoch + timedelta(minutes=i)
+        warranty_start = date(2022, 1, 1) + timedelta(days=rng.randint(0, 900))
+        status = rng.choices(STATUSES, weights=(30, 55, 10, 4, 1))[0]
+        equipment.append(
+            {
+                "equipment_id": i,
+                "asset_tag": f"NWCS-{i:07d}",
+                "serial_number": f"SN{rng.getrandbits(40):010X}",
+                "device_name": f"{rng.choice(FORM_FACTORS)}-{i}",
+                "location_id": rng.randint(1, len(locations)),
+                "status": status,
+                "manufacturer": rng.choice(MANUFACTURERS),
+                "model": f"Model {rng.randint(1, 40)}",
+                "form_factor": rng.choice(FORM_FACTORS),
+                "ram": rng.choice(("8GB", "16GB", "32GB")),
+                "storage_capacity": rng.choice(("256GB", "512GB", "1TB")),
+                "storage_type": rng.choice(("SSD", "HDD")),
+                "operating_system": rng.choice(OPERATING_SYSTEMS),
+                "warranty_start_date": warranty_start.isoformat(),
+                "warranty_end_date": (
+                    warranty_start + timedelta(days=3 * 365)
+                ).isoformat(),
+                "notes": None,
+                "created_at": created_at.isoformat(),
+                "updated_at": created_at.isoformat(),
+            }
+        )
+        history.append(
+            {
+                "history_id": len(history) + 1,
+                "equipment_id": i,
+                "location_id": equipment[-1]["location_id"],
+                "status": "Available",
+                "device_user_id": None,
+                "assignment_start_date": None,
+                "assignment_end_date": None,
+                "change_date": created_at.isoformat(),
+                "change_made_by": 1,
+            }
+        )
+        if status == "In Use":
+            device_user_id = rng.randint(1, len(device_users))
+            start = (created_at + timedelta(days=1)).date().isoformat()
+            assignments.append(
+                {
+                    "assignment_id": len(assignments) + 1,
+                    "equipment_id": i,
+                    "device_user_id": device_user_id,
+                    "assignment_start_date": start,
+                    "assignment_purpose": None,
+                    "created_at": created_at.isoformat(),
+                }
+            )
+            history.append(
+                {
+                    "history_id": len(history) + 1,
+                    "equipment_id": i,
+                    "location_id": equipment[-1]["location_id"],
+                    "status": "In Use",
+                    "device_user_id": device_user_id,
+                    "assignment_start_date": start,
+                    "assignment_end_date": None,
+                    "change_date": created_at.isoformat(),
+                    "change_made_by": 1,
+                }
+            )
+
+    return {
+        "app_users": [
+            {
+                "user_id": 1,
+                "username": "admin",
+                "password_hash": "",
+                "first_name": "Admin",
+                "last_name": "User",
+                "is_admin": True,
+                "created_at": epoch.isoformat(),
+                "updated_at": epoch.isoformat(),
+            }
+        ],
+        "buildings": buildings,
+        "locations": locations,
+        "departments": departments,
+        "employment_types": employment_types,
+        "device_users": device_users,
+        "equipment": equipment,
+        "equipment_assignments": assignments,
+        "equipment_history": history,
+    }
@@ -0,0 +1,33 @@
+-- Dashboard distributions computed as GROUP BY aggregates in the database.
+-- Apply in the Supabase SQL editor (or psql) before deploying the backend.
+--
+--   select * from equipment_distribution('manufacturer');
+
+create or replace function equipment_distribution(group_by text)
+returns table (name text, value bigint)
+language plpgsql
+stable
+as $$
+begin
+    if group_by = 'building' then
+        return query
+            select coalesce(b.building_name, 'Unassigned')::text, count(*)
+            from equipment e
+            left join locations l on l.location_id = e.location_id
+            left join buildings b on b.building_id = l.building_id
+            where e.location_id is not null
+            group by 1
+            order by 2 desc;
+    elsif group_by in ('manufacturer', 'form_factor', 'status') then
+        return query execute format(
+            'select %1$I::text, count(*) from equipment
+             where %1$I is not null
+             group by 1
+             order by 2 desc',
+            group_by
+        );
+    else
+        raise exception 'Unsupported distribution: %', group_by;
+    end if;
+end;
+$$;
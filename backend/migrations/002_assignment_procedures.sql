@@ -0,0 +1,113 @@
+-- Assignment create/end as single transactional round trips.
+-- Each function locks the equipment row, so two clerks cannot assign the same
+-- device at once, and does the status update and history insert atomically.
+--
+-- Errors raised here surface through PostgREST with these SQLSTATEs:
+--   P0002 (no_data_found)    equipment or assignment does not exist
+--   P0001 (raise_exception)  equipment is not available for assignment
+
+create or replace function create_assignment(
+    p_equipment_id integer,
+    p_device_user_id integer,
+    p_assignment_start_date date,
+    p_assignment_purpose text default null,
+    p_change_made_by integer default 1
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_equipment equipment%rowtype;
+    v_assignment equipment_assignments%rowtype;
+begin
+    select * into v_equipment
+    from equipment
+    where equipment_id = p_equipment_id
+    for update;
+
+    if not found then
+        raise exception 'Equipment not found' using errcode = 'no_data_found';
+    end if;
+
+    if v_equipment.status not in ('Available', 'In Storage') then
+        raise exception 'Equipment is not available (current status: %)',
+            v_equipment.status;
+    end if;
+
+    insert into equipment_assignments (
+        equipment_id, device_user_id, assignment_start_date, assignment_purpose
+    )
+    values (
+        p_equipment_id, p_device_user_id, p_assignment_start_date, p_assignment_purpose
+    )
+    returning * into v_assignment;
+
+    update equipment
+    set status = 'In Use'
+    where equipment_id = p_equipment_id;
+
+    insert into equipment_history (
+        equipment_id, device_user_id, location_id, status,
+        assignment_start_date, change_made_by
+    )
+    values (
+        p_equipment_id, p_device_user_id, v_equipment.location_id, 'In Use',
+        p_assignment_start_date, p_change_made_by
+    );
+
+    return jsonb_build_object(
+        'assignment', to_jsonb(v_assignment),
+        'previous_status', v_equipment.status
+    );
+end;
+$$;
+
+
+create or replace function end_assignment(
+    p_assignment_id integer,
+    p_new_status text default 'Available',
+    p_change_made_by integer default 1
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_assignment equipment_assignments%rowtype;
+    v_previous_status text;
+begin
+    select * into v_assignment
+    from equipment_assignments
+    where assignment_id = p_assignment_id
+    for update;
+
+    if not found then
+        raise exception 'Assignment not found' using errcode = 'no_data_found';
+    end if;
+
+    select status into v_previous_status
+    from equipment
+    where equipment_id = v_assignment.equipment_id
+    for update;
+
+    update equipment
+    set status = p_new_status
+    where equipment_id = v_assignment.equipment_id;
+
+    insert into equipment_history (
+        equipment_id, device_user_id, status, assignment_start_date,
+        assignment_end_date, change_made_by
+    )
+    values (
+        v_assignment.equipment_id, v_assignment.device_user_id, p_new_status,
+        v_assignment.assignment_start_date, current_date, p_change_made_by
+    );
+
+    delete from equipment_assignments
+    where assignment_id = p_assignment_id;
+
+    return jsonb_build_object(
+        'equipment_id', v_assignment.equipment_id,
+        'previous_status', v_previous_status
+    );
+end;
+$$;
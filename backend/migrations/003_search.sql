@@ -0,0 +1,129 @@
+-- Indexed, ranked search over equipment and device users.
+--
+-- Each table gets a generated tsvector column with a GIN index for
+-- token/prefix matches, plus trigram indexes on the identifier columns so
+-- partial asset tags and serial numbers still match without a sequential scan.
+
+create extension if not exists pg_trgm;
+
+alter table equipment
+    add column if not exists search_vector tsvector
+    generated always as (
+        to_tsvector(
+            'simple',
+            coalesce(asset_tag, '') || ' ' ||
+            coalesce(serial_number, '') || ' ' ||
+            coalesce(device_name, '') || ' ' ||
+            coalesce(model, '')
+        )
+    ) stored;
+
+create index if not exists equipment_search_vector_idx
+    on equipment using gin (search_vector);
+create index if not exists equipment_asset_tag_trgm_idx
+    on equipment using gin (asset_tag gin_trgm_ops);
+create index if not exists equipment_serial_number_trgm_idx
+    on equipment using gin (serial_number gin_trgm_ops);
+
+alter table device_users
+    add column if not exists search_vector tsvector
+    generated always as (
+        to_tsvector(
+            'simple',
+            coalesce(first_name, '') || ' ' ||
+            coalesce(last_name, '') || ' ' ||
+            coalesce(email, '')
+        )
+    ) stored;
+
+create index if not exists device_users_search_vector_idx
+    on device_users using gin (search_vector);
+create index if not exists device_users_email_trgm_idx
+    on device_users using gin (email gin_trgm_ops);
+
+
+-- 'dell lat' -> 'dell':* & 'lat':*  (every term must match, as a prefix)
+create or replace function search_prefix_query(p_query text)
+returns tsquery
+language sql
+immutable
+as $$
+    select to_tsquery('simple', string_agg(quote_literal(term) || ':*', ' & '))
+    from regexp_split_to_table(lower(trim(p_query)), '\s+') as term
+    where term <> '';
+$$;
+
+
+create or replace function search_equipment(p_query text, p_limit integer default 50)
+returns table (
+    equipment_id integer,
+    asset_tag text,
+    serial_number text,
+    device_name text,
+    status text,
+    form_factor text,
+    updated_at timestamp,
+    rank real
+)
+language sql
+stable
+as $$
+    select
+        e.equipment_id,
+        e.asset_tag::text,
+        e.serial_number::text,
+        e.device_name::text,
+        e.status::text,
+        e.form_factor::text,
+        e.updated_at::timestamp,
+        (
+            ts_rank(e.search_vector, search_prefix_query(p_query))
+            + greatest(
+                similarity(e.asset_tag, p_query),
+                similarity(coalesce(e.serial_number, ''), p_query)
+            )
+        )::real as rank
+    from equipment e
+    where e.search_vector @@ search_prefix_query(p_query)
+       or e.asset_tag % p_query
+       or e.serial_number % p_query
+    order by rank desc, e.equipment_id
+    limit p_limit;
+$$;
+
+
+create or replace function search_device_users(p_query text, p_limit integer default 50)
+returns table (
+    device_user_id integer,
+    first_name text,
+    last_name text,
+    email text,
+    department_name text,
+    device_count bigint,
+    rank real
+)
+language sql
+stable
+as $$
+    select
+        u.device_user_id,
+        u.first_name::text,
+        u.last_name::text,
+        u.email::text,
+        d.department_name::text,
+        (
+            select count(*)
+            from equipment_assignments a
+            where a.device_user_id = u.device_user_id
+        ),
+        (
+            ts_rank(u.search_vector, search_prefix_query(p_query))
+            + similarity(coalesce(u.email, ''), p_query)
+        )::real as rank
+    from device_users u
+    left join departments d on d.department_id = u.department_id
+    where u.search_vector @@ search_prefix_query(p_query)
+       or u.email % p_query
+    order by rank desc, u.device_user_id
+    limit p_limit;
+$$;
@@ -0,0 +1,8 @@
+-- Index backing the equipment detail view and /equipment/{id}/history.
+--
+-- Both read one equipment's history newest first, optionally bounded by a
+-- change_date range, and page with a (change_date, history_id) keyset; this
+-- index serves all of that without sorting the equipment's whole history.
+
+create index if not exists equipment_history_equipment_change_date_idx
+    on equipment_history (equipment_id, change_date desc, history_id desc);
@@ -0,0 +1,72 @@
+-- Current assignee stored on the equipment row.
+--
+-- equipment.current_device_user_id always holds the device user of the
+-- equipment's most recent assignment (or null), so the equipment list embeds
+-- one device user per row instead of every assignment. A trigger on
+-- equipment_assignments keeps it current for every write path: the
+-- create_assignment()/end_assignment() functions, PUT /assignments and edits
+-- made directly in the database.
+--
+-- The list embeds it with an explicit hint, because equipment also reaches
+-- device_users through equipment_assignments:
+--
+--   assigned_to:device_users!current_device_user_id (first_name, last_name)
+
+alter table equipment
+    add column if not exists current_device_user_id integer
+    references device_users (device_user_id);
+
+create index if not exists equipment_current_device_user_id_idx
+    on equipment (current_device_user_id);
+
+create index if not exists equipment_assignments_equipment_start_idx
+    on equipment_assignments (equipment_id, assignment_start_date desc, assignment_id desc);
+
+
+create or replace function current_device_user_id(p_equipment_id integer)
+returns integer
+language sql
+stable
+as $$
+    select device_user_id
+    from equipment_assignments
+    where equipment_id = p_equipment_id
+    order by assignment_start_date desc, assignment_id desc
+    limit 1;
+$$;
+
+
+create or replace function sync_current_device_user()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        update equipment
+        set current_device_user_id = current_device_user_id(old.equipment_id)
+        where equipment_id = old.equipment_id;
+    end if;
+
+    if tg_op in ('INSERT', 'UPDATE') then
+        update equipment
+        set current_device_user_id = current_device_user_id(new.equipment_id)
+        where equipment_id = new.equipment_id;
+    end if;
+
+    return null;
+end;
+$$;
+
+drop trigger if exists equipment_assignments_sync_current_device_user
+    on equipment_assignments;
+
+create trigger equipment_assignments_sync_current_device_user
+    after insert or delete or update of equipment_id, device_user_id, assignment_start_date
+    on equipment_assignments
+    for each row
+    execute function sync_current_device_user();
+
+
+-- Backfill existing equipment
+update equipment
+set current_device_user_id = current_device_user_id(equipment_id);
@@ -0,0 +1,207 @@
+-- Set-based batch versions of create_assignment()/end_assignment() for fleet
+-- rollouts and returns: one call checks availability for the whole batch,
+-- inserts/updates/deletes with multi-row statements and writes all history
+-- rows in the same transaction.
+--
+-- Items that fail a check (unknown or unavailable equipment, unknown device
+-- user or assignment, duplicates within the batch) are skipped and reported;
+-- every other item is applied. The result has one entry per input item, in
+-- input order:
+--
+--   {"index": 0, "status": "created", "assignment": {...}, "previous_status": "Available"}
+--   {"index": 1, "status": "error", "equipment_id": 42, "error": "..."}
+
+create or replace function create_assignments(
+    p_items jsonb,
+    p_change_made_by integer default 1
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_results jsonb;
+begin
+    -- Lock the batch's equipment in key order so overlapping batches cannot
+    -- deadlock or assign the same device twice
+    perform 1
+    from equipment
+    where equipment_id in (
+        select (item ->> 'equipment_id')::integer
+        from jsonb_array_elements(p_items) as item
+    )
+    order by equipment_id
+    for update;
+
+    with items as (
+        select
+            ordinality - 1 as index,
+            (item ->> 'equipment_id')::integer as equipment_id,
+            (item ->> 'device_user_id')::integer as device_user_id,
+            (item ->> 'assignment_start_date')::date as assignment_start_date,
+            item ->> 'assignment_purpose' as assignment_purpose
+        from jsonb_array_elements(p_items) with ordinality as batch (item, ordinality)
+    ),
+    checked as (
+        select
+            items.*,
+            equipment.status as previous_status,
+            equipment.location_id,
+            case
+                when equipment.equipment_id is null then 'Equipment not found'
+                when device_users.device_user_id is null then 'Device user not found'
+                when count(*) over (partition by items.equipment_id) > 1
+                    then 'Equipment appears more than once in the batch'
+                when equipment.status not in ('Available', 'In Storage')
+                    then format(
+                        'Equipment is not available (current status: %s)',
+                        equipment.status
+                    )
+            end as error
+        from items
+        left join equipment using (equipment_id)
+        left join device_users using (device_user_id)
+    ),
+    inserted as (
+        insert into equipment_assignments (
+            equipment_id, device_user_id, assignment_start_date, assignment_purpose
+        )
+        select equipment_id, device_user_id, assignment_start_date, assignment_purpose
+        from checked
+        where error is null
+        returning *
+    ),
+    status_updates as (
+        update equipment
+        set status = 'In Use'
+        from inserted
+        where equipment.equipment_id = inserted.equipment_id
+    ),
+    history as (
+        insert into equipment_history (
+            equipment_id, device_user_id, location_id, status,
+            assignment_start_date, change_made_by
+        )
+        select
+            equipment_id, device_user_id, location_id, 'In Use',
+            assignment_start_date, p_change_made_by
+        from checked
+        where error is null
+    )
+    select jsonb_agg(
+        case
+            when checked.error is null then jsonb_build_object(
+                'index', checked.index,
+                'status', 'created',
+                'assignment', to_jsonb(inserted),
+                'previous_status', checked.previous_status
+            )
+            else jsonb_build_object(
+                'index', checked.index,
+                'status', 'error',
+                'equipment_id', checked.equipment_id,
+                'error', checked.error
+            )
+        end
+        order by checked.index
+    )
+    into v_results
+    from checked
+    left join inserted
+        on checked.error is null and inserted.equipment_id = checked.equipment_id;
+
+    return coalesce(v_results, '[]'::jsonb);
+end;
+$$;
+
+
+create or replace function end_assignments(
+    p_assignment_ids integer[],
+    p_new_status text default 'Available',
+    p_change_made_by integer default 1
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_results jsonb;
+begin
+    perform 1
+    from equipment
+    where equipment_id in (
+        select equipment_id
+        from equipment_assignments
+        where assignment_id = any (p_assignment_ids)
+    )
+    order by equipment_id
+    for update;
+
+    with requested as (
+        select ordinality - 1 as index, assignment_id
+        from unnest(p_assignment_ids) with ordinality as batch (assignment_id, ordinality)
+    ),
+    checked as (
+        select
+            requested.index,
+            requested.assignment_id,
+            equipment_assignments.equipment_id,
+            equipment_assignments.device_user_id,
+            equipment_assignments.assignment_start_date,
+            equipment.status as previous_status,
+            case
+                when equipment_assignments.assignment_id is null
+                    then 'Assignment not found'
+                when count(*) over (partition by requested.assignment_id) > 1
+                    then 'Assignment appears more than once in the batch'
+            end as error
+        from requested
+        left join equipment_assignments using (assignment_id)
+        left join equipment using (equipment_id)
+    ),
+    status_updates as (
+        update equipment
+        set status = p_new_status
+        from checked
+        where checked.error is null
+            and equipment.equipment_id = checked.equipment_id
+    ),
+    history as (
+        insert into equipment_history (
+            equipment_id, device_user_id, status, assignment_start_date,
+            assignment_end_date, change_made_by
+        )
+        select
+            equipment_id, device_user_id, p_new_status, assignment_start_date,
+            current_date, p_change_made_by
+        from checked
+        where error is null
+    ),
+    deleted as (
+        delete from equipment_assignments
+        using checked
+        where checked.error is null
+            and equipment_assignments.assignment_id = checked.assignment_id
+    )
+    select jsonb_agg(
+        case
+            when error is null then jsonb_build_object(
+                'index', index,
+                'status', 'ended',
+                'assignment_id', assignment_id,
+                'equipment_id', equipment_id,
+                'previous_status', previous_status
+            )
+            else jsonb_build_object(
+                'index', index,
+                'status', 'error',
+                'assignment_id', assignment_id,
+                'error', error
+            )
+        end
+        order by index
+    )
+    into v_results
+    from checked;
+
+    return coalesce(v_results, '[]'::jsonb);
+end;
+$$;
@@ -0,0 +1,143 @@
+-- Device counts stored on the device user row.
+--
+-- device_users.device_count always holds the number of equipment_assignments
+-- rows for the user, kept current by a trigger on equipment_assignments, so
+-- the users page can list, sort and filter users by device count without
+-- embedding their assignments. department_device_counts() rolls the counts up
+-- per department.
+
+alter table device_users
+    add column if not exists device_count integer not null default 0;
+
+create index if not exists device_users_device_count_idx
+    on device_users (device_count desc, device_user_id);
+
+create index if not exists device_users_department_id_idx
+    on device_users (department_id);
+
+
+create or replace function sync_device_count()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op = 'UPDATE' and old.device_user_id is not distinct from new.device_user_id then
+        return null;
+    end if;
+
+    if tg_op in ('UPDATE', 'DELETE') then
+        update device_users
+        set device_count = device_count - 1
+        where device_user_id = old.device_user_id;
+    end if;
+
+    if tg_op in ('INSERT', 'UPDATE') then
+        update device_users
+        set device_count = device_count + 1
+        where device_user_id = new.device_user_id;
+    end if;
+
+    return null;
+end;
+$$;
+
+drop trigger if exists equipment_assignments_sync_device_count
+    on equipment_assignments;
+
+create trigger equipment_assignments_sync_device_count
+    after insert or delete or update of device_user_id
+    on equipment_assignments
+    for each row
+    execute function sync_device_count();
+
+
+create or replace function department_device_counts()
+returns table (
+    department_id integer,
+    department_name text,
+    user_count bigint,
+    device_count bigint
+)
+language sql
+stable
+as $$
+    select
+        d.department_id,
+        d.department_name::text,
+        count(u.device_user_id),
+        coalesce(sum(u.device_count), 0)
+    from departments d
+    left join device_users u on u.department_id = d.department_id
+    group by d.department_id, d.department_name
+    order by coalesce(sum(u.device_count), 0) desc, d.department_id;
+$$;
+
+
+-- Search results read the stored count instead of counting assignments, and
+-- take the listing filters, applied before the limit so a page of matches is
+-- never cut short by them. Matches are paged with p_offset, in rank order or
+-- in the listing's sort orders (p_sort 'name' or 'device_count', nulls last
+-- either way). The signature changes, so the old one goes first.
+drop function if exists search_device_users(text, integer);
+
+create or replace function search_device_users(
+    p_query text,
+    p_limit integer default 50,
+    p_department_id integer default null,
+    p_min_devices integer default null,
+    p_max_devices integer default null,
+    p_offset integer default 0,
+    p_sort text default null,
+    p_desc boolean default false
+)
+returns table (
+    device_user_id integer,
+    first_name text,
+    last_name text,
+    email text,
+    department_name text,
+    device_count bigint,
+    rank real
+)
+language sql
+stable
+as $$
+    select
+        u.device_user_id,
+        u.first_name::text,
+        u.last_name::text,
+        u.email::text,
+        d.department_name::text,
+        u.device_count::bigint,
+        (
+            ts_rank(u.search_vector, search_prefix_query(p_query))
+            + similarity(coalesce(u.email, ''), p_query)
+        )::real as rank
+    from device_users u
+    left join departments d on d.department_id = u.department_id
+    where (u.search_vector @@ search_prefix_query(p_query) or u.email % p_query)
+      and (p_department_id is null or u.department_id = p_department_id)
+      and (p_min_devices is null or u.device_count >= p_min_devices)
+      and (p_max_devices is null or u.device_count <= p_max_devices)
+    order by
+        case when p_sort = 'name' and not p_desc then u.last_name end nulls last,
+        case when p_sort = 'name' and not p_desc then u.first_name end nulls last,
+        case when p_sort = 'name' and p_desc then u.last_name end desc nulls last,
+        case when p_sort = 'name' and p_desc then u.first_name end desc nulls last,
+        case when p_sort = 'device_count' and not p_desc then u.device_count end,
+        case when p_sort = 'device_count' and p_desc then u.device_count end desc,
+        case when p_sort is not null and p_desc then u.device_user_id end desc,
+        rank desc,
+        u.device_user_id
+    limit p_limit
+    offset p_offset;
+$$;
+
+
+-- Backfill existing users
+update device_users u
+set device_count = (
+    select count(*)
+    from equipment_assignments a
+    where a.device_user_id = u.device_user_id
+);
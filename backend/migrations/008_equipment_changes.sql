@@ -0,0 +1,60 @@
+-- Delta sync for the equipment list (GET /equipment/changes).
+--
+-- Clients keep a local copy of the list and ask for the rows changed since a
+-- cursor, an (updated_at, equipment_id) position. updated_at is therefore
+-- bumped by every write to an equipment row, including the ones made by
+-- triggers such as sync_current_device_user(), and deleted equipment leaves a
+-- tombstone behind. Equipment is normally disposed of rather than deleted,
+-- so tombstones are few and kept for good: any cursor can be replayed.
+
+create or replace function touch_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at = now();
+    return new;
+end;
+$$;
+
+drop trigger if exists equipment_touch_updated_at on equipment;
+
+create trigger equipment_touch_updated_at
+    before update on equipment
+    for each row
+    when (old.* is distinct from new.*)
+    execute function touch_updated_at();
+
+create index if not exists equipment_updated_at_idx
+    on equipment (updated_at, equipment_id);
+
+
+create table if not exists equipment_tombstones (
+    equipment_id integer primary key,
+    deleted_at timestamp not null default now()
+);
+
+create index if not exists equipment_tombstones_deleted_at_idx
+    on equipment_tombstones (deleted_at);
+
+
+create or replace function record_equipment_tombstone()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into equipment_tombstones (equipment_id)
+    values (old.equipment_id)
+    on conflict (equipment_id) do update
+    set deleted_at = excluded.deleted_at;
+
+    return null;
+end;
+$$;
+
+drop trigger if exists equipment_record_tombstone on equipment;
+
+create trigger equipment_record_tombstone
+    after delete on equipment
+    for each row
+    execute function record_equipment_tombstone();
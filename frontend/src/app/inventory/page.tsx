@@ -29,16 +29,9 @@ export default function InventoryPage() {
   const handleSearch = useCallback(async () => {
     try {
       const response = await fetch(
-        `http://localhost:8000/api/inventory/search`,
-        {
-          method: "POST",
-          headers: {
-            "Content-Type": "application/json",
-          },
-          body: JSON.stringify({
-            query: searchQuery,
-          }),
-        }
+        `http://localhost:8000/api/inventory/autocomplete?q=${encodeURIComponent(
+          searchQuery
+        )}&limit=50`
       );
       const result = await response.json();
       setInventoryData(result.data || []);
@@ -59,7 +59,6 @@ function getActivityIcon(activityType: string): React.ReactElement {
 
 interface ReportFilters {
   equipmentType: string;
-  department: string;
   status: string;
   startDate: Date | null;
   endDate: Date | null;
@@ -120,10 +119,22 @@ const getHistoryMessage = (history: EquipmentHistory): string => {
   return messages.join(", ");
 };
 
+// Last updated within [startDate, endDate], both days included
+const updatedAtRange = (startDate: Date | null, endDate: Date | null) => {
+  const range: { gte?: string; lt?: string } = {};
+  if (startDate) {
+    range.gte = startDate.toISOString().split("T")[0];
+  }
+  if (endDate) {
+    const nextDay = new Date(endDate.getTime() + 24 * 60 * 60 * 1000);
+    range.lt = nextDay.toISOString().split("T")[0];
+  }
+  return range;
+};
+
 export default function ReportsPage() {
   const [filters, setFilters] = useState<ReportFilters>({
     equipmentType: "",
-    department: "",
     status: "",
     startDate: null,
     endDate: null,
@@ -170,10 +181,8 @@ export default function ReportsPage() {
           body: JSON.stringify({
             filters: {
               type: filters.equipmentType || null,
-              department: filters.department || null,
               status: filters.status || null,
-              start_date: filters.startDate?.toISOString() || null,
-              end_date: filters.endDate?.toISOString() || null,
+              updated_at: updatedAtRange(filters.startDate, filters.endDate),
             },
           }),
         }
@@ -222,8 +231,8 @@ export default function ReportsPage() {
       <div className="bg-white p-4 rounded-lg shadow-sm space-y-4">
         <h2 className="text-lg font-semibold mb-4">Equipment Report</h2>
 
-        {/* Filters Grid - Now 3 columns instead of 4 */}
-        <div className="grid grid-cols-1 md:grid-cols-3 gap-4 mb-4">
+        {/* Filters Grid */}
+        <div className="grid grid-cols-1 md:grid-cols-2 gap-4 mb-4">
           {/* Equipment Type Filter */}
           <Select
             value={filters.equipmentType}
@@ -245,25 +254,6 @@ export default function ReportsPage() {
             </SelectContent>
           </Select>
 
-          {/* Department Filter */}
-          <Select
-            value={filters.department}
-            onValueChange={(value) =>
-              setFilters({ ...filters, department: value })
-            }
-          >
-            <SelectTrigger className="bg-white">
-              <SelectValue placeholder="Department" />
-            </SelectTrigger>
-            <SelectContent className="bg-white">
-              <SelectItem value="it">IT</SelectItem>
-              <SelectItem value="hr">HR</SelectItem>
-              <SelectItem value="sales">Sales</SelectItem>
-              <SelectItem value="engineering">Engineering</SelectItem>
-              <SelectItem value="marketing">Marketing</SelectItem>
-            </SelectContent>
-          </Select>
-
           {/* Status Filter */}
           <Select
             value={filters.status}
@@ -32,6 +32,7 @@ interface UserCard {
 export default function UsersPage() {
   const [users, setUsers] = useState<UserCard[]>([]);
   const [searchQuery, setSearchQuery] = useState("");
+  const [nextOffset, setNextOffset] = useState<number | null>(null);
   const [newUser, setNewUser] = useState({
     first_name: "",
     last_name: "",
@@ -65,13 +66,19 @@ export default function UsersPage() {
     }
   };
 
-  const fetchUsers = async () => {
+  // Results come a page at a time; next_offset is null on the last page
+  const fetchUsers = async (offset = 0) => {
     try {
       const response = await fetch(
-        `http://localhost:8000/api/users/search?query=${searchQuery}`
+        `http://localhost:8000/api/users/search?query=${encodeURIComponent(
+          searchQuery
+        )}&offset=${offset}`
       );
       const data = await response.json();
-      setUsers(data.data);
+      setUsers((current) =>
+        offset === 0 ? data.data : [...current, ...data.data]
+      );
+      setNextOffset(data.next_offset ?? null);
     } catch (error) {
       console.error("Error fetching users:", error);
     }
@@ -197,6 +204,14 @@ export default function UsersPage() {
           </div>
         ))}
       </div>
+
+      {nextOffset !== null && (
+        <div className="flex justify-center mt-6">
+          <Button variant="outline" onClick={() => fetchUsers(nextOffset)}>
+            Load more
+          </Button>
+        </div>
+      )}
     </div>
   );
 }